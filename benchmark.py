@@ -0,0 +1,331 @@
+"""
+Сквозной бенчмарк: сценарии queries/*.py и сводки full_info.py на графах растущего размера.
+
+Для каждого размера графа в отдельном процессе измеряются время загрузки, задержки
+сценариев (p50/p90/p99) и пиковая память процесса. Результаты пишутся в JSON; с --baseline
+они сравниваются с прошлым прогоном, и регрессии выше порога дают ненулевой код выхода.
+
+Отдельно измеряется время импорта лёгких модулей запросов к эмбеддингам в чистом
+интерпретаторе: регрессия — если импорт потянул torch/pykeen/matplotlib/sklearn
+или превысил STARTUP_BUDGET_MS.
+
+Использование:
+    python benchmark.py --scales 1,10,100 --out bench/results.json
+    python benchmark.py --scales 1,10 --baseline bench/results.json --threshold 1.25
+    python benchmark.py --startup-only          # только время импорта, без графов и baseline
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from utils import peak_rss_mb
+
+REAL_ONTOLOGY = "data/hsr_ontology.rdf"
+DEFAULT_SCALES = "1,10"
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 1.2
+
+STARTUP_MODULES = ("train_hsr_embeddings", "embedding_store", "embedding_index")
+HEAVY_MODULES = ("torch", "pykeen", "torch_directml", "matplotlib", "sklearn")
+STARTUP_BUDGET_MS = 500
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def latency_stats(seconds):
+    ms = [s * 1000 for s in seconds]
+    return {
+        "runs": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p90_ms": round(percentile(ms, 0.90), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+    }
+
+
+@contextlib.contextmanager
+def shared_graph(graph):
+    """Внутри блока любой Graph.parse(...) подключается к уже загруженному графу вместо чтения файла."""
+    from rdflib import Graph
+
+    original = Graph.parse
+
+    def parse(self, *args, **kwargs):
+        Graph.__init__(self, store=graph.store, identifier=graph.identifier)
+        return self
+
+    Graph.parse = parse
+    try:
+        yield
+    finally:
+        Graph.parse = original
+
+
+@contextlib.contextmanager
+def timed_queries(sink):
+    from rdflib import Graph
+
+    original = Graph.query
+
+    def query(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = original(self, *args, **kwargs)
+        if getattr(result, "type", None) == "SELECT":
+            result.bindings = list(result.bindings)
+        sink.append(time.perf_counter() - started)
+        return result
+
+    Graph.query = query
+    try:
+        yield
+    finally:
+        Graph.query = original
+
+
+def _bench_graph(label, path, scenarios, repeat):
+    """Выполняется в отдельном процессе, чтобы пиковая память относилась к одному графу."""
+    from rdflib import Graph
+    from full_info import iter_summaries, render_summaries
+
+    started = time.perf_counter()
+    g = Graph()
+    g.parse(path)
+    load_s = time.perf_counter() - started
+
+    entry = {
+        "graph": label,
+        "triples": len(g),
+        "load_ms": round(load_s * 1000, 3),
+        "scenarios": {},
+    }
+
+    for script in scenarios:
+        runs = []
+        query_times = []
+        error = None
+        for i in range(repeat):
+            random.seed(i)
+            started = time.perf_counter()
+            try:
+                with shared_graph(g), timed_queries(query_times), contextlib.redirect_stdout(io.StringIO()):
+                    runpy.run_path(script, run_name="__main__")
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            runs.append(time.perf_counter() - started)
+        stats = latency_stats(runs) if runs else {"runs": 0}
+        stats["queries_per_run"] = len(query_times) // max(1, len(runs))
+        if query_times:
+            stats["query_p50_ms"] = round(percentile(query_times, 0.5) * 1000, 3)
+        if error:
+            stats["error"] = error
+        entry["scenarios"][script] = stats
+
+    for fmt in ("text", "jsonl"):
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in render_summaries(iter_summaries(g), fmt):
+                pass
+            runs.append(time.perf_counter() - started)
+        entry["scenarios"][f"full_info.py --format {fmt}"] = latency_stats(runs)
+
+    entry["peak_rss_mb"] = peak_rss_mb()
+    return entry
+
+
+def measure_startup(module, repeat=DEFAULT_REPEAT):
+    """Время импорта модуля в новом интерпретаторе и список тяжёлых модулей, попавших в sys.modules."""
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({'ms': (time.perf_counter() - started) * 1000,"
+        f" 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    stats = latency_stats([r["ms"] / 1000 for r in runs])
+    stats["heavy_modules"] = sorted({m for r in runs for m in r["heavy"]})
+    return stats
+
+
+def run_benchmark(scales, repeat=DEFAULT_REPEAT, include_real=True, scenarios=None, workdir=None, seed=42):
+    from synthetic_graph import write_graph
+
+    scenarios = scenarios or sorted(glob.glob("queries/*.py"))
+    graphs = []
+    if include_real and os.path.exists(REAL_ONTOLOGY):
+        graphs.append(("real", REAL_ONTOLOGY))
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for scale in scales:
+            path = os.path.join(tmp, f"synthetic_x{scale:g}.nt")
+            write_graph(path, scale=scale, seed=seed)
+            graphs.append((f"x{scale:g}", path))
+
+        results = []
+        ctx = get_context("spawn")
+        for label, path in graphs:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                entry = pool.submit(_bench_graph, label, path, scenarios, repeat).result()
+            print(f"{label}: {entry['triples']} триплетов, загрузка {entry['load_ms']:.0f} ms, "
+                  f"пик {entry['peak_rss_mb']} MB", file=sys.stderr)
+            results.append(entry)
+
+    return {
+        "meta": _meta(repeat, seed),
+        "results": results,
+        "startup": run_startup(repeat),
+    }
+
+
+def _meta(repeat, seed=None):
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+    }
+
+
+def run_startup(repeat=DEFAULT_REPEAT):
+    return {module: measure_startup(module, repeat) for module in STARTUP_MODULES}
+
+
+def check_startup(startup, baseline_startup=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Регрессии времени импорта: тяжёлый модуль в sys.modules или p50 выше STARTUP_BUDGET_MS —
+    всегда, замедление относительно baseline — только если он передан.
+    """
+    baseline_startup = baseline_startup or {}
+    regressions = []
+    for module, stats in startup.items():
+        before = baseline_startup.get(module, {}).get("p50_ms")
+        if stats["heavy_modules"]:
+            regressions.append({"graph": "startup", "metric": module, "heavy_modules": stats["heavy_modules"]})
+        if stats["p50_ms"] > STARTUP_BUDGET_MS or (before and stats["p50_ms"] / before > threshold):
+            regressions.append({"graph": "startup", "metric": module, "baseline_ms": before,
+                                "current_ms": stats["p50_ms"],
+                                "ratio": round(stats["p50_ms"] / before, 3) if before else None})
+    return regressions
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Сравнивает p50 сценариев и время загрузки с baseline; возвращает список регрессий."""
+    base = {r["graph"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for entry in current["results"]:
+        old = base.get(entry["graph"])
+        if old is None:
+            continue
+        pairs = [("load", entry.get("load_ms"), old.get("load_ms"))]
+        for name, stats in entry["scenarios"].items():
+            pairs.append((name, stats.get("p50_ms"), old.get("scenarios", {}).get(name, {}).get("p50_ms")))
+        for name, now, before in pairs:
+            if not now or not before:
+                continue
+            ratio = now / before
+            entry.setdefault("baseline_ratio", {})[name] = round(ratio, 3)
+            if ratio > threshold:
+                regressions.append({"graph": entry["graph"], "metric": name, "baseline_ms": before,
+                                    "current_ms": now, "ratio": round(ratio, 3)})
+    regressions += check_startup(current.get("startup", {}), baseline.get("startup"), threshold)
+    return regressions
+
+
+def print_table(report):
+    print(f"{'graph':>8} | {'scenario':<28} | {'p50 ms':>10} | {'p90 ms':>10} | {'p99 ms':>10} | {'vs base':>7}")
+    print("-" * 90)
+    for entry in report["results"]:
+        ratios = entry.get("baseline_ratio", {})
+        print(f"{entry['graph']:>8} | {'load':<28} | {entry['load_ms']:>10.1f} | {'':>10} | {'':>10} | "
+              f"{ratios.get('load', ''):>7}")
+        for name, stats in entry["scenarios"].items():
+            if "p50_ms" not in stats:
+                print(f"{entry['graph']:>8} | {name:<28} | {stats.get('error', '—')}")
+                continue
+            print(f"{entry['graph']:>8} | {name:<28} | {stats['p50_ms']:>10.1f} | {stats['p90_ms']:>10.1f} | "
+                  f"{stats['p99_ms']:>10.1f} | {ratios.get(name, ''):>7}")
+    for module, stats in report.get("startup", {}).items():
+        heavy = f"  импортированы: {', '.join(stats['heavy_modules'])}" if stats["heavy_modules"] else ""
+        print(f"{'startup':>8} | {module:<28} | {stats['p50_ms']:>10.1f} | {stats['p90_ms']:>10.1f} | "
+              f"{stats['p99_ms']:>10.1f} |{heavy}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк сценариев queries/*.py и full_info.py на графах разного размера")
+    ap.add_argument("--scales", default=DEFAULT_SCALES, help="Множители размера синтетических графов через запятую")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Сколько раз прогонять каждый сценарий")
+    ap.add_argument("--no-real", action="store_true", help="Не включать реальную онтологию")
+    ap.add_argument("--scenario", action="append", help="Только указанные скрипты (можно несколько раз)")
+    ap.add_argument("--out", default="bench_results.json", help="Куда записать результаты")
+    ap.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустимое замедление p50 относительно baseline")
+    ap.add_argument("--startup-only", action="store_true",
+                    help=f"Только время импорта {', '.join(STARTUP_MODULES)}: без графов, baseline не обязателен")
+    args = ap.parse_args()
+
+    if args.startup_only:
+        report = {"meta": _meta(args.repeat), "results": [], "startup": run_startup(args.repeat)}
+    else:
+        scales = [float(s) for s in args.scales.split(",") if s.strip()]
+        report = run_benchmark(scales, repeat=args.repeat, include_real=not args.no_real, scenarios=args.scenario)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report["baseline"] = {"path": args.baseline, "threshold": args.threshold, "regressions": regressions}
+    else:
+        # тяжёлые импорты и бюджет времени импорта проверяются и без baseline
+        regressions = check_startup(report["startup"])
+
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_table(report)
+    print(f"\nРезультаты сохранены в {args.out}")
+    if regressions:
+        print(f"Регрессии (> x{args.threshold}):")
+        for r in regressions:
+            if "heavy_modules" in r:
+                print(f"  {r['graph']} {r['metric']}: при импорте загружены {', '.join(r['heavy_modules'])}")
+            elif r["baseline_ms"] is None:
+                print(f"  {r['graph']} {r['metric']}: {r['current_ms']} ms, бюджет {STARTUP_BUDGET_MS} ms")
+            else:
+                print(f"  {r['graph']} {r['metric']}: {r['baseline_ms']} -> {r['current_ms']} ms (x{r['ratio']})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
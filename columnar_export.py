@@ -0,0 +1,205 @@
+"""
+Выгрузка онтологии в колоночные таблицы для аналитики (pandas, DuckDB, polars).
+
+Для каждого класса — своя таблица: строка на сущность, столбец на свойство.
+Тип столбца определяется схемой онтологии, а не данными: функциональные свойства
+(ontology/build.py, FUNCTIONAL_PROPERTIES) — скалярные столбцы, все остальные — списки,
+даже если в текущей выгрузке у всех по одному значению. Строковые значения хранятся
+со словарным кодированием. Формат —
+Parquet или Arrow IPC (последний читается через memory map без копирования).
+
+Рядом с таблицами пишется manifest.json с хешем исходных триплетов каждой таблицы:
+при повторном запуске перезаписываются только таблицы, чьи триплеты изменились.
+
+Использование:
+    python columnar_export.py --out export/
+    python columnar_export.py --out export/ --format arrow
+
+    import duckdb; duckdb.sql("SELECT id, hasElement, hasCavernRelic FROM 'export/characters.parquet'")
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import pyarrow as pa
+import pyarrow.parquet as pq
+from rdflib import Graph, Literal, RDF, RDFS
+
+from ontology.build import FUNCTIONAL_PROPERTIES, HSR
+
+ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+MANIFEST = "manifest.json"
+EXPORT_VERSION = 2
+
+# таблица -> классы, сущности которых в неё попадают
+TABLES = {
+    "characters": (HSR.Character,),
+    "light_cones": (HSR.LightCone,),
+    "relics": (HSR.Set, HSR.CavernRelics, HSR.PlanarRelics),
+    "enemies": (HSR.Enemies,),
+    "teams": (HSR.Team,),
+}
+
+# скалярные столбцы; схема таблицы не меняется от выгрузки к выгрузке
+SCALAR_PROPERTIES = {HSR[name] for name in FUNCTIONAL_PROPERTIES}
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+_STRING_DICT = pa.dictionary(pa.int32(), pa.string())
+
+
+def local_name(node):
+    s = str(node)
+    return s.split("#")[-1] if "#" in s else s.rstrip("/").split("/")[-1]
+
+
+def column_name(prop):
+    if prop == RDFS.label:
+        return "label"
+    if prop == RDFS.comment:
+        return "comment"
+    return local_name(prop)
+
+
+def _value(node):
+    return str(node) if isinstance(node, Literal) else local_name(node)
+
+
+def collect_table(graph: Graph, classes):
+    """
+    Сущности классов и их свойства: (subjects, {свойство: [[значения] на сущность]}, хеш триплетов).
+    Хеш считается по отсортированным N-Triples всех триплетов этих сущностей.
+    """
+    subjects = sorted({s for cls in classes for s in graph.subjects(RDF.type, cls)}, key=str)
+    values = {}
+    h = hashlib.sha1()
+    for row, s in enumerate(subjects):
+        lines = []
+        for p, o in graph.predicate_objects(s):
+            lines.append(f"{s.n3()} {p.n3()} {o.n3()} .")
+            if p == RDF.type:
+                continue
+            column = values.get(p)
+            if column is None:
+                column = values[p] = [[] for _ in subjects]
+            column[row].append(o)
+        for line in sorted(lines):
+            h.update(line.encode("utf-8"))
+            h.update(b"\n")
+    return subjects, values, h.hexdigest()
+
+
+def _string_array(strings):
+    return pa.array(strings, type=pa.string()).dictionary_encode()
+
+
+def _list_array(lists):
+    offsets, flat = [0], []
+    for items in lists:
+        flat.extend(items)
+        offsets.append(len(flat))
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), _string_array(flat))
+
+
+def build_table(graph: Graph, subjects, values, classes):
+    """Arrow-таблица: id, [types], затем свойства в алфавитном порядке столбцов."""
+    columns = {"id": _string_array([local_name(s) for s in subjects])}
+    if len(classes) > 1:
+        types = [sorted(local_name(c) for c in graph.objects(s, RDF.type) if c in classes) for s in subjects]
+        columns["types"] = _list_array(types)
+
+    for prop in sorted(values, key=column_name):
+        cells = [sorted(_value(o) for o in objs) for objs in values[prop]]
+        if prop not in SCALAR_PROPERTIES:
+            columns[column_name(prop)] = _list_array(cells)
+            continue
+        for s, c in zip(subjects, cells):
+            if len(c) > 1:
+                print(f"Предупреждение: у {local_name(s)} несколько значений функционального свойства "
+                      f"{column_name(prop)} ({', '.join(c)}), в таблицу попадает {c[0]}", file=sys.stderr)
+        columns[column_name(prop)] = _string_array([c[0] if c else None for c in cells])
+    return pa.table(columns)
+
+
+def write_table(table, path: str, format: str = "parquet"):
+    tmp = path + ".tmp"
+    if format == "parquet":
+        pq.write_table(table, tmp, use_dictionary=True, compression="zstd")
+    else:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def read_table(path: str):
+    """Чтение выгрузки: Arrow IPC отображается в память без копирования, Parquet читается обычно."""
+    if path.endswith(FORMATS["arrow"]):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pq.read_table(path, memory_map=True)
+
+
+def _load_manifest(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == EXPORT_VERSION else {}
+
+
+def export(graph: Graph, out_dir: str, format: str = "parquet", tables=None, force: bool = False):
+    """
+    Выгружает таблицы в out_dir. Таблица пропускается, если хеш её триплетов совпал
+    с записанным в manifest.json и файл на месте. Возвращает {таблица: "written" | "unchanged"}.
+    """
+    tables = tables or TABLES
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = _load_manifest(manifest_path)
+    entries = manifest.get("tables", {})
+
+    status = {}
+    for name, classes in tables.items():
+        subjects, values, digest = collect_table(graph, classes)
+        path = os.path.join(out_dir, name + FORMATS[format])
+        previous = entries.get(name)
+        if (not force and previous and previous["hash"] == digest
+                and previous["format"] == format and os.path.exists(path)):
+            status[name] = "unchanged"
+            continue
+
+        table = build_table(graph, subjects, values, classes)
+        write_table(table, path, format)
+        entries[name] = {"hash": digest, "format": format, "rows": table.num_rows,
+                         "file": os.path.basename(path)}
+        status[name] = "written"
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": EXPORT_VERSION, "tables": entries}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, manifest_path)
+    return status
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Выгрузка онтологии в колоночные таблицы (Parquet / Arrow IPC)")
+    ap.add_argument("--out", default="export", help="Каталог для таблиц")
+    ap.add_argument("--format", choices=list(FORMATS), default="parquet")
+    ap.add_argument("--table", action="append", choices=list(TABLES), help="Выгрузить только эти таблицы")
+    ap.add_argument("--force", action="store_true", help="Перезаписать таблицы, даже если триплеты не менялись")
+    ap.add_argument("--ontology", default=ONTOLOGY_PATH)
+    args = ap.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology)
+    tables = {name: TABLES[name] for name in args.table} if args.table else None
+    status = export(g, args.out, args.format, tables, args.force)
+
+    manifest = _load_manifest(os.path.join(args.out, MANIFEST))["tables"]
+    for name, state in status.items():
+        print(f"{name}: {manifest[name]['rows']} строк — {'записана' if state == 'written' else 'без изменений'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Поиск похожих сущностей по эмбеддингам без повторных вычислений на каждый запрос.
+
+Матрица эмбеддингов нормируется по L2 один раз, поэтому косинусная близость —
+это скалярное произведение: для одного запроса — умножение матрицы на вектор,
+для пакета запросов — одно умножение матриц. Топ-k выбирается через argpartition,
+без полной сортировки всех сущностей.
+
+PartitionedIndex разбивает сущности по rdf:type с учётом выведенных по RDFS типов
+(embedding_triples.entity_types_of) на Character, LightCone, Set, Enemies, Team:
+запрос с фильтром по типу просматривает только свою партицию — маленькие точно,
+большие через IVF (кластеры spherical k-means, просмотр n_probe ближайших).
+
+Модуль зависит только от NumPy; построение из модели pykeen — в train_hsr_embeddings.py.
+"""
+import numpy as np
+
+HSR_NS = "http://example.org/hsr-ontology#"
+PARTITION_CLASSES = tuple(HSR_NS + name for name in ("Character", "LightCone", "Set", "Enemies", "Team"))
+EXACT_THRESHOLD = 20_000    # партиции меньше этого размера ищутся точно
+DEFAULT_N_PROBE = 8
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_rows(scores, k: int):
+    """Индексы k наибольших значений в каждой строке (по убыванию); -inf отбрасываются вызывающим."""
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+class SimilarityIndex:
+    def __init__(self, embeddings, labels, entity_types=None):
+        self.matrix = normalize_rows(embeddings)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.entity_types = entity_types or {}
+        self._type_masks = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _mask_for(self, types):
+        """Булева маска сущностей, у которых есть хотя бы один из types."""
+        mask = np.zeros(len(self.labels), dtype=bool)
+        for t in types:
+            type_mask = self._type_masks.get(t)
+            if type_mask is None:
+                type_mask = np.array([t in self.entity_types.get(label, ()) for label in self.labels])
+                self._type_masks[t] = type_mask
+            mask |= type_mask
+        return mask
+
+    def similarities(self, uris):
+        """Косинусная близость запросов ко всем сущностям: матрица len(uris) × N."""
+        ids = [self.index[u] for u in uris]
+        return self.matrix[ids] @ self.matrix.T
+
+    def top_k(self, uri, k: int = 5, same_type: bool = True):
+        return self.top_k_batch([uri], k, same_type)[0]
+
+    def top_k_batch(self, uris, k: int = 5, same_type: bool = True):
+        """
+        Топ-k похожих для каждого запроса: [[(uri, близость)], ...]. Неизвестные сущности дают [].
+        При same_type сначала идут сущности общего с запросом типа, остаток добирается из прочих.
+        """
+        known = [u for u in uris if u in self.index]
+        results = {}
+        if known:
+            scores = self.similarities(known)
+            rows = np.arange(len(known))
+            scores[rows, [self.index[u] for u in known]] = -np.inf
+
+            masks = None
+            if same_type and self.entity_types:
+                masks = np.ones_like(scores, dtype=bool)
+                for r, uri in enumerate(known):
+                    types = self.entity_types.get(uri)
+                    if types:
+                        masks[r] = self._mask_for(types)
+
+            if masks is None:
+                first, rest = scores, None
+            else:
+                first = np.where(masks, scores, -np.inf)
+                rest = np.where(masks, -np.inf, scores)
+
+            top_first = top_k_rows(first, k)
+            top_rest = top_k_rows(rest, k) if rest is not None else None
+            for r, uri in enumerate(known):
+                picked = [i for i in top_first[r] if np.isfinite(first[r, i])]
+                if top_rest is not None and len(picked) < k:
+                    picked += [i for i in top_rest[r] if np.isfinite(rest[r, i])][:k - len(picked)]
+                results[uri] = [(self.labels[i], float(scores[r, i])) for i in picked]
+        return [results.get(u, []) for u in uris]
+
+
+class ExactPartition:
+    """Точный поиск: одно умножение на матрицу партиции."""
+
+    def __init__(self, ids, vectors):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k: int):
+        scores = self.vectors @ query
+        top = top_k_rows(scores, k)[0]
+        return self.ids[top], scores[top]
+
+
+def spherical_kmeans(vectors, n_clusters: int, iterations: int = 10, seed: int = 0, sample: int = 50_000):
+    """k-means по косинусу на выборке; центроиды нормированы."""
+    rng = np.random.default_rng(seed)
+    train = vectors if len(vectors) <= sample else vectors[rng.choice(len(vectors), sample, replace=False)]
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(train @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        empty = ~sums.any(axis=1)
+        sums[empty] = train[rng.choice(len(train), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFPartition:
+    """
+    Приближённый поиск в стиле IVF: векторы разбиты на кластеры spherical k-means,
+    запрос просматривает только n_probe ближайших кластеров. Векторы хранятся
+    отсортированными по кластеру, так что каждый кластер — непрерывный срез.
+    """
+
+    def __init__(self, ids, vectors, n_lists: int | None = None, n_probe: int = DEFAULT_N_PROBE, seed: int = 0,
+                 chunk: int = 65_536):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        self.centroids = spherical_kmeans(vectors, n_lists, seed=seed)
+        assign = np.concatenate([
+            np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1) for i in range(0, len(vectors), chunk)
+        ])
+        order = np.argsort(assign, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.offsets = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self.n_probe = n_probe
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k: int, n_probe: int | None = None):
+        probes = top_k_rows(self.centroids @ query, n_probe or self.n_probe)[0]
+        ids, scores = [], []
+        for c in probes:
+            start, end = self.offsets[c], self.offsets[c + 1]
+            if start < end:
+                scores.append(self.vectors[start:end] @ query)
+                ids.append(self.ids[start:end])
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        top = top_k_rows(scores, k)[0]
+        return ids[top], scores[top]
+
+
+class PartitionedIndex:
+    """
+    Индекс ближайших соседей, разбитый по rdf:type. Поиск с фильтром по типу идёт
+    только внутри партиции: маленькие — точно, большие (от exact_threshold) — через IVF.
+    Сущность с несколькими типами попадает в каждую свою партицию.
+    """
+
+    def __init__(self, matrix, labels, entity_types, classes=PARTITION_CLASSES,
+                 exact_threshold: int = EXACT_THRESHOLD, n_probe: int = DEFAULT_N_PROBE, normalized: bool = False):
+        self.matrix = matrix if normalized else normalize_rows(matrix)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.entity_types = entity_types
+
+        members = {cls: [] for cls in classes}
+        for i, label in enumerate(self.labels):
+            for t in entity_types.get(label, ()):
+                if t in members:
+                    members[t].append(i)
+
+        self.partitions = {}
+        for cls, ids in members.items():
+            if not ids:
+                continue
+            ids = np.array(ids, dtype=np.int64)
+            if len(ids) < exact_threshold:
+                self.partitions[cls] = ExactPartition(ids, self.matrix[ids])
+            else:
+                self.partitions[cls] = IVFPartition(ids, self.matrix[ids], n_probe=n_probe)
+
+    @classmethod
+    def from_similarity_index(cls, index: SimilarityIndex, **kwargs):
+        return cls(index.matrix, index.labels, index.entity_types, normalized=True, **kwargs)
+
+    def search(self, vector, cls: str, k: int = 5):
+        """Ближайшие к вектору сущности класса cls: [(uri, близость)]."""
+        partition = self.partitions.get(cls)
+        if partition is None:
+            return []
+        query = normalize_rows(np.atleast_2d(vector))[0]
+        ids, scores = partition.search(query, k)
+        return [(self.labels[i], float(s)) for i, s in zip(ids, scores)]
+
+    def similar(self, uri, k: int = 5, cls: str | None = None):
+        """Похожие на uri сущности того же типа (или класса cls), без самой uri."""
+        i = self.index.get(uri)
+        if i is None:
+            return []
+        classes = [cls] if cls else [t for t in self.entity_types.get(uri, ()) if t in self.partitions]
+        best = {}
+        for c in classes:
+            partition = self.partitions.get(c)
+            if partition is None:
+                continue
+            ids, scores = partition.search(self.matrix[i], k + 1)
+            for j, s in zip(ids, scores):
+                if j != i:
+                    best[j] = float(s)
+        ranked = sorted(best.items(), key=lambda x: -x[1])[:k]
+        return [(self.labels[j], s) for j, s in ranked]
+
+    def similar_batch(self, uris, k: int = 5, cls: str | None = None):
+        return [self.similar(uri, k, cls) for uri in uris]
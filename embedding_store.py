@@ -0,0 +1,260 @@
+"""
+Артефакт эмбеддингов для запросов без torch и pykeen.
+
+После обучения train_hsr_embeddings.py сохраняет в hsr_embedding_results/serving/:
+    entities.npy, relations.npy   — матрицы эмбеддингов (float32 или complex64)
+    entities.txt, relations.txt   — IRI по строке на id
+    entity_types.json             — {тип: [id сущностей]}
+    triples.npy                   — известные триплеты (head, relation, tail) в id, для фильтрации
+    meta.json                     — модель, размерность, число сущностей и отношений
+
+Матрицы открываются через np.load(mmap_mode="r"): загрузка занимает миллисекунды,
+а несколько процессов делят одни и те же страницы через кэш ОС.
+
+Использование:
+    python embedding_store.py Seele --top 5
+    python embedding_store.py Seele --relation recommendedLightCone --top 5
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+SERVING_DIR = os.path.join("hsr_embedding_results", "serving")
+STORE_VERSION = 1
+HSR_NS = "http://example.org/hsr-ontology#"
+DISTANCE_BLOCK = 1 << 22    # элементов во временном массиве (n, блок, d) при расстоянии L1
+
+
+def _write_lines(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(item)
+            f.write("\n")
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def write_store(out_dir: str, entity_matrix, relation_matrix, entity_labels, relation_labels,
+                entity_types: dict | None = None, model_name: str = "DistMult", triples=None):
+    """Пишет артефакт; entity_labels[i] — IRI сущности с id i (так же для отношений)."""
+    os.makedirs(out_dir, exist_ok=True)
+    entity_matrix = np.ascontiguousarray(entity_matrix)
+    relation_matrix = np.ascontiguousarray(relation_matrix)
+    if len(entity_matrix) != len(entity_labels) or len(relation_matrix) != len(relation_labels):
+        raise ValueError("Число строк матрицы не совпадает с числом IRI.")
+
+    np.save(os.path.join(out_dir, "entities.npy"), entity_matrix)
+    np.save(os.path.join(out_dir, "relations.npy"), relation_matrix)
+    _write_lines(os.path.join(out_dir, "entities.txt"), entity_labels)
+    _write_lines(os.path.join(out_dir, "relations.txt"), relation_labels)
+    if triples is not None:
+        np.save(os.path.join(out_dir, "triples.npy"), np.asarray(triples, dtype=np.int64).reshape(-1, 3))
+
+    by_type = {}
+    if entity_types:
+        ids = {label: i for i, label in enumerate(entity_labels)}
+        for label, types in entity_types.items():
+            i = ids.get(label)
+            if i is None:
+                continue
+            for t in types:
+                by_type.setdefault(t, []).append(i)
+    with open(os.path.join(out_dir, "entity_types.json"), "w", encoding="utf-8") as f:
+        json.dump({t: sorted(v) for t, v in by_type.items()}, f, separators=(",", ":"))
+
+    meta = {
+        "version": STORE_VERSION,
+        "model": model_name,
+        "dim": int(entity_matrix.shape[1]),
+        "dtype": str(entity_matrix.dtype),
+        "entities": len(entity_labels),
+        "relations": len(relation_labels),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+class EmbeddingStore:
+    def __init__(self, directory: str, entities, relations, meta):
+        self.directory = directory
+        self.entities = entities
+        self.relations = relations
+        self.meta = meta
+        self.model = meta["model"]
+        self._entity_labels = None
+        self._relation_labels = None
+        self._entity_ids = None
+        self._relation_ids = None
+        self._types = None
+
+    @classmethod
+    def load(cls, directory: str = SERVING_DIR, mmap: bool = True):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия артефакта: {meta.get('version')}")
+        mode = "r" if mmap else None
+        entities = np.load(os.path.join(directory, "entities.npy"), mmap_mode=mode)
+        relations = np.load(os.path.join(directory, "relations.npy"), mmap_mode=mode)
+        return cls(directory, entities, relations, meta)
+
+    # карты id <-> IRI читаются при первом обращении
+
+    @property
+    def entity_labels(self):
+        if self._entity_labels is None:
+            self._entity_labels = _read_lines(os.path.join(self.directory, "entities.txt"))
+        return self._entity_labels
+
+    @property
+    def relation_labels(self):
+        if self._relation_labels is None:
+            self._relation_labels = _read_lines(os.path.join(self.directory, "relations.txt"))
+        return self._relation_labels
+
+    @property
+    def entity_to_id(self):
+        if self._entity_ids is None:
+            self._entity_ids = {label: i for i, label in enumerate(self.entity_labels)}
+        return self._entity_ids
+
+    @property
+    def relation_to_id(self):
+        if self._relation_ids is None:
+            self._relation_ids = {label: i for i, label in enumerate(self.relation_labels)}
+        return self._relation_ids
+
+    @property
+    def entity_types(self):
+        """{тип: np.array id сущностей}."""
+        if self._types is None:
+            with open(os.path.join(self.directory, "entity_types.json"), encoding="utf-8") as f:
+                self._types = {t: np.array(ids, dtype=np.int64) for t, ids in json.load(f).items()}
+        return self._types
+
+    def types_by_entity(self):
+        """{IRI: set(типов)} — в формате entity_types из train_hsr_embeddings.py."""
+        result = {}
+        labels = self.entity_labels
+        for t, ids in self.entity_types.items():
+            for i in ids:
+                result.setdefault(labels[i], set()).add(t)
+        return result
+
+    def known_triples(self):
+        """Известные триплеты (n, 3) в id; пустой массив, если артефакт записан без них."""
+        path = os.path.join(self.directory, "triples.npy")
+        if not os.path.exists(path):
+            return np.empty((0, 3), dtype=np.int64)
+        return np.load(path, mmap_mode="r")
+
+    def entity_vector(self, uri):
+        i = self.entity_to_id.get(uri)
+        return None if i is None else np.asarray(self.entities[i])
+
+    def relation_vector(self, uri):
+        i = self.relation_to_id.get(uri)
+        return None if i is None else np.asarray(self.relations[i])
+
+    def feature_matrix(self):
+        """Вещественная матрица сущностей (комплексные эмбеддинги — как [Re, Im])."""
+        matrix = self.entities
+        if np.iscomplexobj(matrix):
+            return np.concatenate([matrix.real, matrix.imag], axis=1)
+        return np.asarray(matrix)
+
+    def similarity_index(self):
+        from embedding_index import SimilarityIndex
+        return SimilarityIndex(self.feature_matrix(), self.entity_labels, self.types_by_entity())
+
+    def score_tails(self, heads, relations, candidates=None):
+        """
+        Оценки (h, r, t) для всех t из candidates (по умолчанию для всех сущностей):
+        матрица len(heads) × len(candidates). heads, relations — массивы id.
+        """
+        h = np.asarray(self.entities[np.asarray(heads)])
+        r = np.asarray(self.relations[np.asarray(relations)])
+        t = np.asarray(self.entities if candidates is None else self.entities[np.asarray(candidates)])
+        return interaction(self.model, h, r, t)
+
+    def score_heads(self, relations, tails, candidates=None):
+        """Оценки (h, r, t) для всех h из candidates: матрица len(tails) × len(candidates)."""
+        r = np.asarray(self.relations[np.asarray(relations)])
+        t = np.asarray(self.entities[np.asarray(tails)])
+        h = np.asarray(self.entities if candidates is None else self.entities[np.asarray(candidates)])
+        return interaction(self.model, h, r, t, by_head=True)
+
+
+def _pairwise_distance(a, b, p):
+    """
+    ||a_i - b_j||_p для всех пар: a — (n, d), b — (m, d), без тензора (n, m, d) на все кандидаты:
+    L2 через ||a||² + ||b||² - 2·Re(a·b̄), L1 — по блокам кандидатов не больше DISTANCE_BLOCK элементов.
+    """
+    if p == 2:
+        sq = ((np.abs(a) ** 2).sum(axis=1)[:, None] + (np.abs(b) ** 2).sum(axis=1)[None, :]
+              - 2 * np.real(a @ np.conj(b).T))
+        return np.sqrt(np.maximum(sq, 0))
+    out = np.empty((a.shape[0], b.shape[0]), dtype=np.abs(a[:0]).dtype)
+    step = max(1, DISTANCE_BLOCK // max(1, a.shape[0] * a.shape[1]))
+    for start in range(0, b.shape[0], step):
+        out[:, start:start + step] = np.abs(a[:, None, :] - b[None, start:start + step, :]).sum(axis=-1)
+    return out
+
+
+def interaction(model: str, h, r, t, by_head: bool = False):
+    """
+    Функции оценки pykeen для пакета: без by_head — h, r по строкам (B, d), t — кандидаты (N, d);
+    с by_head — h кандидаты (N, d), r, t по строкам (B, d). Результат (B, N).
+    """
+    if model == "DistMult":
+        return (t * r) @ h.T if by_head else (h * r) @ t.T
+    if model == "ComplEx":
+        if by_head:
+            return np.real((r * np.conj(t)) @ h.T)
+        return np.real((h * r) @ np.conj(t).T)
+    if model == "TransE":
+        # pykeen TransE: -||h + r - t||_1
+        return -_pairwise_distance(t - r, h, 1) if by_head else -_pairwise_distance(h + r, t, 1)
+    if model == "RotatE":
+        # pykeen RotatE: -||h * r - t||_2, r на единичной окружности
+        if by_head:
+            return -_pairwise_distance(t * np.conj(r), h, 2)
+        return -_pairwise_distance(h * r, t, 2)
+    raise ValueError(f"Нет функции оценки для модели {model}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Запросы к эмбеддингам без torch: похожие сущности и оценка связей")
+    ap.add_argument("entity", help="Локальное имя сущности, например Seele")
+    ap.add_argument("--relation", help="Если указано — топ хвостов (entity, relation, ?) по функции оценки модели")
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--dir", default=SERVING_DIR)
+    args = ap.parse_args()
+
+    store = EmbeddingStore.load(args.dir)
+    uri = HSR_NS + args.entity
+    if uri not in store.entity_to_id:
+        print(f"Сущность {uri} не найдена в графе.")
+        return
+
+    if args.relation:
+        rel = HSR_NS + args.relation
+        if rel not in store.relation_to_id:
+            print(f"Отношение {rel} не найдено в графе.")
+            return
+        scores = store.score_tails([store.entity_to_id[uri]], [store.relation_to_id[rel]])[0]
+        top = np.argsort(-scores)[:args.top]
+        for i in top:
+            print(f"  {store.entity_labels[i].split('#')[-1]}: {scores[i]:.4f}")
+        return
+
+    for label, sim in store.similarity_index().top_k(uri, args.top):
+        print(f"  {label.split('#')[-1]}: {sim:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Перебор моделей и гиперпараметров эмбеддингов: TransE, DistMult, ComplEx, RotatE
+по размерностям и скоростям обучения — вся сетка или случайная выборка из неё.
+
+Триплеты отбираются и кодируются один раз (sweep/triples.npz); конфигурации обучаются
+параллельно в пуле процессов. Число потоков torch в каждом процессе закреплено, чтобы
+процессы не отнимали ядра друг у друга: workers × threads = число ядер. Каждая
+конфигурация обучается с ранней остановкой по MRR на валидации и пишет result.json
+в свой каталог; готовые конфигурации при повторном запуске пропускаются. В конце
+печатается таблица лидеров: MRR и Hits@k против времени обучения и пиковой памяти.
+
+Использование:
+    python embedding_sweep.py
+    python embedding_sweep.py --models TransE,RotatE --dims 64,128 --lrs 0.001,0.01
+    python embedding_sweep.py --random 8 --threads 2
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import numpy as np
+
+from train_hsr_embeddings import (
+    EVAL_FREQUENCY,
+    NUM_EPOCHS,
+    PATIENCE,
+    checkpoint_directory,
+    find_rdf_file,
+    run_training_pipeline,
+)
+from utils import file_sha1, peak_rss_mb
+
+SWEEP_DIR = os.path.join("hsr_embedding_results", "sweep")
+CHECKPOINT_NAME = "checkpoint.pt"
+MODELS = ("TransE", "DistMult", "ComplEx", "RotatE")
+DIMS = (64, 128, 256)
+LEARNING_RATES = (0.001, 0.005, 0.01)
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def sweep_configs(models=MODELS, dims=DIMS, learning_rates=LEARNING_RATES, sample: int | None = None, seed: int = 42):
+    """Вся сетка конфигураций или sample случайных из неё."""
+    grid = [
+        {"model": m, "embedding_dim": d, "lr": lr}
+        for m, d, lr in itertools.product(models, dims, learning_rates)
+    ]
+    if sample is not None and sample < len(grid):
+        grid = random.Random(seed).sample(grid, sample)
+    return grid
+
+
+def config_key(config, data_sha1: str, num_epochs: int, patience: int, eval_frequency: int) -> str:
+    """Имя каталога конфигурации: читаемая часть и хеш всего, от чего зависит результат."""
+    payload = json.dumps(
+        {**config, "data": data_sha1, "epochs": num_epochs, "patience": patience, "eval": eval_frequency},
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:10]
+    return f"{config['model']}-d{config['embedding_dim']}-lr{config['lr']}-{digest}"
+
+
+def prepare_triples(rdf_file_path: str, sweep_dir: str = SWEEP_DIR):
+    """Отбор и кодирование триплетов один раз на весь перебор; возвращает путь к npz и отпечаток RDF."""
+    data_sha1 = file_sha1(rdf_file_path)
+    path = os.path.join(sweep_dir, "triples.npz")
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if str(data["sha1"]) == data_sha1:
+                return path, data_sha1
+
+    from rdflib import Graph
+    from embedding_triples import DEFAULT_SELECTION, encode_triples, select_triples
+
+    g = Graph()
+    g.parse(rdf_file_path, format="xml")
+    selected, _ = select_triples(g, DEFAULT_SELECTION)
+    mapped, entity_to_id, relation_to_id = encode_triples(selected)
+
+    os.makedirs(sweep_dir, exist_ok=True)
+    np.savez(
+        path,
+        mapped=mapped,
+        entities=np.array(sorted(entity_to_id, key=entity_to_id.get)),
+        relations=np.array(sorted(relation_to_id, key=relation_to_id.get)),
+        sha1=np.array(data_sha1),
+    )
+    return path, data_sha1
+
+
+def _pin_threads(threads: int):
+    # до импорта torch: OpenMP/MKL читают переменные окружения при загрузке
+    for name in THREAD_ENV:
+        os.environ[name] = str(threads)
+
+
+def run_config(config, triples_path: str, run_dir: str, threads: int,
+               num_epochs: int = NUM_EPOCHS, patience: int = PATIENCE, eval_frequency: int = EVAL_FREQUENCY):
+    """Обучение одной конфигурации в отдельном процессе; результат пишется в run_dir/result.json."""
+    _pin_threads(threads)
+
+    import torch
+    from pykeen.triples import TriplesFactory
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    with np.load(triples_path) as data:
+        mapped = data["mapped"]
+        entity_to_id = {str(label): i for i, label in enumerate(data["entities"])}
+        relation_to_id = {str(label): i for i, label in enumerate(data["relations"])}
+    tf = TriplesFactory(
+        mapped_triples=torch.from_numpy(mapped),
+        entity_to_id=entity_to_id,
+        relation_to_id=relation_to_id,
+    )
+    training, testing, validation = tf.split([0.8, 0.1, 0.1], random_state=42)
+
+    started = time.perf_counter()
+    result = run_training_pipeline(
+        run_dir,
+        CHECKPOINT_NAME,
+        num_epochs,
+        patience,
+        eval_frequency,
+        training=training,
+        testing=testing,
+        validation=validation,
+        model=config["model"],
+        model_kwargs=dict(embedding_dim=config["embedding_dim"]),
+        optimizer="Adam",
+        optimizer_kwargs=dict(lr=config["lr"]),
+        random_seed=42,
+        device="cpu",
+    )
+    seconds = time.perf_counter() - started
+
+    result.save_to_directory(run_dir)
+    entry = {
+        "config": config,
+        "metrics": result.metric_results.to_dict(),
+        "epochs": len(result.losses),
+        "train_seconds": round(seconds, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "threads": threads,
+    }
+    with open(os.path.join(run_dir, "result.json"), "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(checkpoint_directory(run_dir, CHECKPOINT_NAME), ignore_errors=True)
+    return entry
+
+
+def _load_result(run_dir: str):
+    path = os.path.join(run_dir, "result.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_sweep(rdf_file_path: str, configs, sweep_dir: str = SWEEP_DIR, workers: int | None = None,
+              threads: int = 1, num_epochs: int = NUM_EPOCHS, patience: int = PATIENCE,
+              eval_frequency: int = EVAL_FREQUENCY):
+    """Обучает недостающие конфигурации в пуле процессов; возвращает результаты всех конфигураций."""
+    triples_path, data_sha1 = prepare_triples(rdf_file_path, sweep_dir)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+
+    results, pending = [], []
+    for config in configs:
+        run_dir = os.path.join(sweep_dir, config_key(config, data_sha1, num_epochs, patience, eval_frequency))
+        done = _load_result(run_dir)
+        if done is not None:
+            results.append(done)
+        else:
+            pending.append((config, run_dir))
+    print(f"Конфигураций: {len(configs)}, готовых: {len(results)}, к обучению: {len(pending)} "
+          f"({workers} процессов × {threads} потоков)", file=sys.stderr)
+
+    if pending:
+        # новый процесс на каждую конфигурацию: пиковая память не копится между запусками;
+        # max_tasks_per_child есть с Python 3.11, раньше процессы переиспользуются
+        # и peak_rss_mb включает прошлые конфигурации того же процесса
+        ctx = get_context("spawn")
+        pool_kwargs = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, **pool_kwargs) as pool:
+            futures = {
+                pool.submit(run_config, config, triples_path, run_dir, threads, num_epochs, patience,
+                            eval_frequency): config
+                for config, run_dir in pending
+            }
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    print(f"{config}: ошибка {e}", file=sys.stderr)
+                    continue
+                mrr = _metric(entry, "inverse_harmonic_mean_rank")
+                print(f"{config}: MRR {mrr if mrr is None else round(mrr, 4)}, {entry['train_seconds']:.0f} s",
+                      file=sys.stderr)
+                results.append(entry)
+    return results
+
+
+def _metric(entry, name):
+    return entry["metrics"].get("both", {}).get("realistic", {}).get(name)
+
+
+def leaderboard(results):
+    """Строки таблицы лидеров по убыванию MRR."""
+    rows = []
+    for entry in results:
+        config = entry["config"]
+        rows.append({
+            "model": config["model"],
+            "dim": config["embedding_dim"],
+            "lr": config["lr"],
+            "mrr": _metric(entry, "inverse_harmonic_mean_rank"),
+            "hits_at_1": _metric(entry, "hits_at_1"),
+            "hits_at_3": _metric(entry, "hits_at_3"),
+            "hits_at_10": _metric(entry, "hits_at_10"),
+            "epochs": entry["epochs"],
+            "train_seconds": entry["train_seconds"],
+            "peak_rss_mb": entry["peak_rss_mb"],
+        })
+    rows.sort(key=lambda r: -(r["mrr"] or 0.0))
+    return rows
+
+
+def print_leaderboard(rows):
+    print(f"{'model':<9} | {'dim':>4} | {'lr':>6} | {'MRR':>6} | {'H@1':>6} | {'H@3':>6} | {'H@10':>6} | "
+          f"{'epochs':>6} | {'time s':>7} | {'peak MB':>8}")
+    print("-" * 92)
+    for r in rows:
+        scores = " | ".join(f"{r[k]:>6.4f}" if r[k] is not None else f"{'—':>6}"
+                            for k in ("mrr", "hits_at_1", "hits_at_3", "hits_at_10"))
+        peak = f"{r['peak_rss_mb']:>8.1f}" if r["peak_rss_mb"] is not None else f"{'—':>8}"
+        print(f"{r['model']:<9} | {r['dim']:>4} | {r['lr']:>6g} | {scores} | {r['epochs']:>6} | "
+              f"{r['train_seconds']:>7.1f} | {peak}")
+
+
+def _split(value, cast):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Параллельный перебор моделей и гиперпараметров эмбеддингов")
+    ap.add_argument("--rdf", help="Файл онтологии (по умолчанию — как в train_hsr_embeddings.py)")
+    ap.add_argument("--models", default=",".join(MODELS))
+    ap.add_argument("--dims", default=",".join(map(str, DIMS)))
+    ap.add_argument("--lrs", default=",".join(map(str, LEARNING_RATES)))
+    ap.add_argument("--random", type=int, help="Случайная выборка из сетки вместо всей сетки")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--threads", type=int, default=1, help="Потоков torch на процесс")
+    ap.add_argument("--workers", type=int, help="Процессов (по умолчанию ядра / threads)")
+    ap.add_argument("--epochs", type=int, default=NUM_EPOCHS)
+    ap.add_argument("--patience", type=int, default=PATIENCE)
+    ap.add_argument("--eval-every", type=int, default=EVAL_FREQUENCY)
+    ap.add_argument("--dir", default=SWEEP_DIR)
+    args = ap.parse_args()
+
+    unknown = set(_split(args.models, str)) - set(MODELS)
+    if unknown:
+        ap.error(f"Неизвестные модели: {', '.join(sorted(unknown))}")
+
+    configs = sweep_configs(_split(args.models, str), _split(args.dims, int), _split(args.lrs, float),
+                            sample=args.random, seed=args.seed)
+    results = run_sweep(args.rdf or find_rdf_file(), configs, args.dir, workers=args.workers,
+                        threads=args.threads, num_epochs=args.epochs, patience=args.patience,
+                        eval_frequency=args.eval_every)
+
+    rows = leaderboard(results)
+    with open(os.path.join(args.dir, "leaderboard.json"), "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    print_leaderboard(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Отбор триплетов для обучения эмбеддингов.
+
+Без отбора в pykeen попадает весь граф: каждая строка rdfs:label, каждый sourceURL
+и каждое описание эффекта из rdfs:comment становятся отдельными сущностями, раздувают
+таблицу эмбеддингов и замедляют каждую эпоху, ничего не давая связям между сущностями.
+Отбор задаётся списком разрешённых/исключённых свойств, пространствами имён и видами
+объектов (IRI, литерал, blank node).
+
+Использование:
+    python embedding_triples.py data/hsr_ontology.rdf
+    python embedding_triples.py data/hsr_ontology.rdf --all
+"""
+import argparse
+import itertools
+import numpy as np
+from rdflib import BNode, Graph, Literal, Namespace, RDF, RDFS, URIRef
+
+from ontology.inference import materialize
+
+HSR = Namespace("http://example.org/hsr-ontology#")
+
+OBJECT_KINDS = ("iri", "literal", "bnode")
+
+
+def object_kind(node):
+    if isinstance(node, Literal):
+        return "literal"
+    if isinstance(node, BNode):
+        return "bnode"
+    return "iri"
+
+
+class TripleSelection:
+    """
+    predicates — разрешённые свойства (None — все, кроме exclude_predicates);
+    namespaces — IRI субъекта и объекта должны начинаться с одного из них (None — любые);
+    object_kinds — допустимые виды объекта.
+    """
+
+    def __init__(self, predicates=None, exclude_predicates=(), namespaces=None, object_kinds=("iri",)):
+        unknown = set(object_kinds) - set(OBJECT_KINDS)
+        if unknown:
+            raise ValueError(f"Неизвестный вид объекта: {', '.join(sorted(unknown))}")
+        self.predicates = None if predicates is None else {URIRef(p) for p in predicates}
+        self.exclude_predicates = {URIRef(p) for p in exclude_predicates}
+        self.namespaces = None if namespaces is None else tuple(str(ns) for ns in namespaces)
+        self.object_kinds = set(object_kinds)
+
+    def _in_namespace(self, node):
+        return self.namespaces is None or not isinstance(node, URIRef) or str(node).startswith(self.namespaces)
+
+    def keep(self, s, p, o):
+        if self.predicates is not None and p not in self.predicates:
+            return False
+        if p in self.exclude_predicates:
+            return False
+        if object_kind(o) not in self.object_kinds:
+            return False
+        return self._in_namespace(s) and self._in_namespace(o)
+
+
+# связи между сущностями HSR и их типы; схема (rdfs:Class, домены и диапазоны свойств),
+# подписи, описания и ссылки на источник не участвуют
+DEFAULT_SELECTION = TripleSelection(
+    exclude_predicates=(RDFS.label, RDFS.comment, HSR.sourceURL, RDFS.domain, RDFS.range, RDFS.subClassOf),
+    namespaces=(str(HSR),),
+    object_kinds=("iri",),
+)
+
+# всё подряд, как было до отбора
+ALL_TRIPLES = TripleSelection(object_kinds=OBJECT_KINDS)
+
+
+def _counts(triples):
+    entities, relations = set(), set()
+    for s, p, o in triples:
+        entities.add(s)
+        entities.add(o)
+        relations.add(p)
+    return {"triples": len(triples), "entities": len(entities), "relations": len(relations)}
+
+
+def select_triples(graph: Graph, selection: TripleSelection = DEFAULT_SELECTION):
+    """
+    Отобранные триплеты (списком) и отчёт {"before": {...}, "after": {...}}
+    с числом триплетов, сущностей и отношений до и после отбора.
+    """
+    everything = list(graph)
+    kept = [t for t in everything if selection.keep(*t)]
+    return kept, {"before": _counts(everything), "after": _counts(kept)}
+
+
+def entity_types_of(graph: Graph, inferred: Graph | None = None):
+    """
+    {IRI сущности: set(IRI классов)} по всем rdf:type графа, независимо от отбора, вместе
+    с выведенными по RDFS (hsr:Set для CavernRelics/PlanarRelics). inferred — уже
+    материализованные выводы (INFERRED_GRAPH из load_with_inference); без него считаются здесь.
+    """
+    if inferred is None:
+        inferred = materialize(graph)
+    entity_types = {}
+    for g in (graph, inferred):
+        for s, o in g.subject_objects(RDF.type):
+            entity_types.setdefault(str(s), set()).add(str(o))
+    return entity_types
+
+
+def term_label(term) -> str:
+    """
+    Метка терма в картах id: IRI как есть, литерал и blank node — в записи N3 (с типом данных
+    и языком), чтобы литерал не совпал с IRI той же строки, а литералы разных типов — друг с другом.
+    """
+    return str(term) if isinstance(term, URIRef) else term.n3()
+
+
+def _assign_ids(labels, base=None):
+    """
+    Перенумерация временных id (порядок вставки в labels) в окончательные:
+    (карта {метка: id}, массив старый -> новый).
+    Без base id идут по отсортированным меткам; с base известные термы сохраняют свой id,
+    новые получают id после них, тоже в порядке сортировки.
+    """
+    labels = list(labels)
+    base = base or {}
+    remap = np.empty(len(labels), dtype=np.int64)
+    new = []
+    for i, label in enumerate(labels):
+        known = base.get(label)
+        if known is None:
+            new.append(i)
+        else:
+            remap[i] = known
+    new.sort(key=labels.__getitem__)
+    remap[new] = np.arange(len(base), len(base) + len(new), dtype=np.int64)
+
+    mapping = dict(base)
+    mapping.update((labels[i], int(remap[i])) for i in new)
+    return mapping, remap
+
+
+def encode_triples(triples, entity_to_id=None, relation_to_id=None):
+    """
+    Триплеты rdflib -> int64-массив (n, 3) с (head, relation, tail) и карты entity_to_id, relation_to_id.
+    Термы нумеруются одним проходом по словарю меток (term_label), без промежуточных строковых
+    массивов; затем id переставляются по отсортированным меткам — так же, как их назначает
+    TriplesFactory.from_labeled_triples.
+    Если переданы прежние карты, id известных термов сохраняются, а новые добавляются в конец
+    (для дообучения, см. train_incremental в train_hsr_embeddings.py).
+    """
+    entities, relations = {}, {}
+    n = len(triples)
+    mapped = np.fromiter(
+        itertools.chain.from_iterable(
+            (entities.setdefault(term_label(s), len(entities)), relations.setdefault(str(p), len(relations)),
+             entities.setdefault(term_label(o), len(entities)))
+            for s, p, o in triples
+        ),
+        dtype=np.int64, count=3 * n,
+    ).reshape(n, 3)
+
+    entity_to_id, entity_remap = _assign_ids(entities, entity_to_id)
+    relation_to_id, relation_remap = _assign_ids(relations, relation_to_id)
+    mapped[:, 0] = entity_remap[mapped[:, 0]]
+    mapped[:, 1] = relation_remap[mapped[:, 1]]
+    mapped[:, 2] = entity_remap[mapped[:, 2]]
+    return mapped, entity_to_id, relation_to_id
+
+
+def format_report(report) -> str:
+    lines = []
+    for key, title in (("triples", "триплетов"), ("entities", "сущностей"), ("relations", "отношений")):
+        before, after = report["before"][key], report["after"][key]
+        cut = 100 * (1 - after / before) if before else 0.0
+        lines.append(f"{title}: {before} -> {after} (-{cut:.1f}%)")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Сколько триплетов, сущностей и отношений остаётся после отбора")
+    ap.add_argument("rdf", help="Файл онтологии")
+    ap.add_argument("--all", action="store_true", help="Без отбора (для сравнения)")
+    args = ap.parse_args()
+
+    g = Graph()
+    g.parse(args.rdf)
+    _, report = select_triples(g, ALL_TRIPLES if args.all else DEFAULT_SELECTION)
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
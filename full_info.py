@@ -2,10 +2,16 @@
 сводка по персонажам и врагам.
 """
 import argparse
+import json
+from collections import defaultdict
 from rdflib import Graph, Namespace, RDF, URIRef, Literal, RDFS
+from name_index import index_for
 
 HSR = Namespace("http://example.org/hsr-ontology#")
 
+OUTPUT_FORMATS = ("text", "json", "jsonl")
+JSON_SECTIONS = {"character": "characters", "enemy": "enemies"}
+
 def local_name(node):
     if isinstance(node, URIRef):
         s = str(node)
@@ -16,30 +22,45 @@ def local_name(node):
         return str(node)
     return str(node)
 
-def gather_list(graph, subject, predicate):
-    return [local_name(o) for o in graph.objects(subject, predicate)]
+def group_by_subject(graph):
+    """
+    Один проход по всем триплетам графа: subject -> predicate -> [objects].
+    """
+    grouped = defaultdict(lambda: defaultdict(list))
+    for s, p, o in graph:
+        grouped[s][p].append(o)
+    return grouped
+
+def subject_props(graph, subject):
+    props = defaultdict(list)
+    for p, o in graph.predicate_objects(subject):
+        props[p].append(o)
+    return props
+
+def _props_list(props, predicate):
+    return [local_name(o) for o in props.get(predicate, ())]
 
-def gather_one(graph, subject, predicate):
-    for o in graph.objects(subject, predicate):
+def _props_one(props, predicate):
+    for o in props.get(predicate, ()):
         return local_name(o)
     return None
 
-def summarize_character(graph, char_uri):
+def summarize_character_props(char_uri, props):
     summary = {}
     summary["character"] = local_name(char_uri)
-    summary["recommendedLightCone"] = gather_one(graph, char_uri, HSR.recommendedLightCone)
-    summary["alternativeLightCones"] = gather_list(graph, char_uri, HSR.hasAlternativeLightCones)
-    summary["recommendedMainStatBody"] = gather_one(graph, char_uri, HSR.recommendedMainStatBody)
-    summary["recommendedMainStatFeet"] = gather_one(graph, char_uri, HSR.recommendedMainStatFeet)
-    summary["recommendedMainStatSphere"] = gather_one(graph, char_uri, HSR.recommendedMainStatSphere)
-    summary["recommendedMainStatRope"] = gather_one(graph, char_uri, HSR.recommendedMainStatRope)
-    summary["recommendedSubStats"] = gather_list(graph, char_uri, HSR.recommendedSubStats)
+    summary["recommendedLightCone"] = _props_one(props, HSR.recommendedLightCone)
+    summary["alternativeLightCones"] = _props_list(props, HSR.hasAlternativeLightCones)
+    summary["recommendedMainStatBody"] = _props_one(props, HSR.recommendedMainStatBody)
+    summary["recommendedMainStatFeet"] = _props_one(props, HSR.recommendedMainStatFeet)
+    summary["recommendedMainStatSphere"] = _props_one(props, HSR.recommendedMainStatSphere)
+    summary["recommendedMainStatRope"] = _props_one(props, HSR.recommendedMainStatRope)
+    summary["recommendedSubStats"] = _props_list(props, HSR.recommendedSubStats)
 
-    cavern = gather_list(graph, char_uri, HSR.hasCavernRelic)
-    planar = gather_list(graph, char_uri, HSR.hasPlanarRelic)
+    cavern = _props_list(props, HSR.hasCavernRelic)
+    planar = _props_list(props, HSR.hasPlanarRelic)
 
     if not cavern and not planar:
-        fallback = gather_list(graph, char_uri, HSR.hasSet)
+        fallback = _props_list(props, HSR.hasSet)
 
         if len(fallback) == 2:
             cavern = [fallback[0]]
@@ -50,79 +71,168 @@ def summarize_character(graph, char_uri):
     summary["cavernRelics"] = cavern
     summary["planarRelics"] = planar
 
-    summary["element"] = gather_one(graph, char_uri, HSR.hasElement)
-    summary["path"] = gather_one(graph, char_uri, HSR.hasPath)
+    summary["element"] = _props_one(props, HSR.hasElement)
+    summary["path"] = _props_one(props, HSR.hasPath)
     return summary
 
-def print_summary(summary):
-    print("===============================================")
-    print(f"Персонаж: {summary.get('character')}")
+def summarize_character(graph, char_uri):
+    return summarize_character_props(char_uri, subject_props(graph, char_uri))
+
+def format_summary(summary):
+    lines = []
+    lines.append("===============================================")
+    lines.append(f"Персонаж: {summary.get('character')}")
     if summary.get("element"):
-        print(f"  Элемент: {summary.get('element')}")
+        lines.append(f"  Элемент: {summary.get('element')}")
     if summary.get("path"):
-        print(f"  Путь: {summary.get('path')}")
-    print(f"  Основной конус: {summary.get('recommendedLightCone') or '—'}")
+        lines.append(f"  Путь: {summary.get('path')}")
+    lines.append(f"  Основной конус: {summary.get('recommendedLightCone') or '—'}")
     if summary.get("alternativeLightCones"):
-        print(f"  Альтернативные конусы: {', '.join(summary.get('alternativeLightCones'))}")
-    print("  Главные статы:")
-    print(f"    Body:   {summary.get('recommendedMainStatBody') or '—'}")
-    print(f"    Feet:   {summary.get('recommendedMainStatFeet') or '—'}")
-    print(f"    Sphere: {summary.get('recommendedMainStatSphere') or '—'}")
-    print(f"    Rope:   {summary.get('recommendedMainStatRope') or '—'}")
+        lines.append(f"  Альтернативные конусы: {', '.join(summary.get('alternativeLightCones'))}")
+    lines.append("  Главные статы:")
+    lines.append(f"    Body:   {summary.get('recommendedMainStatBody') or '—'}")
+    lines.append(f"    Feet:   {summary.get('recommendedMainStatFeet') or '—'}")
+    lines.append(f"    Sphere: {summary.get('recommendedMainStatSphere') or '—'}")
+    lines.append(f"    Rope:   {summary.get('recommendedMainStatRope') or '—'}")
     if summary.get("recommendedSubStats"):
-        print(f"  Побочные статы: {', '.join(summary.get('recommendedSubStats'))}")
+        lines.append(f"  Побочные статы: {', '.join(summary.get('recommendedSubStats'))}")
     else:
-        print("  Побочные статы: —")
-
+        lines.append("  Побочные статы: —")
     cav = summary.get("cavernRelics") or []
     plan = summary.get("planarRelics") or []
     if cav:
-        print(f"  Пещерные реликвии: {', '.join(cav)}")
+        lines.append(f"  Пещерные реликвии: {', '.join(cav)}")
     else:
-        print("  Пещерные реликвии: —")
+        lines.append("  Пещерные реликвии: —")
     if plan:
-        print(f"  Планарные реликвии: {', '.join(plan)}")
+        lines.append(f"  Планарные реликвии: {', '.join(plan)}")
     else:
-        print("  Планарные реликвии: —")
-    print()
+        lines.append("  Планарные реликвии: —")
+    lines.append("")
+    return "\n".join(lines)
 
-def summarize_enemy(graph, enemy_uri):
+def print_summary(summary):
+    print(format_summary(summary))
+
+def summarize_enemy_props(enemy_uri, props):
     summary = {}
     label = None
-    for l in graph.objects(enemy_uri, RDFS.label):
+    for l in props.get(RDFS.label, ()):
         label = str(l)
         break
     summary["enemy"] = label if label else local_name(enemy_uri)
-    summary["weaknesses"] = gather_list(graph, enemy_uri, HSR.hasWeakness)
-    summary["elements"] = gather_list(graph, enemy_uri, HSR.hasElement)
-    summary["source"] = gather_one(graph, enemy_uri, HSR.sourceURL)
+    summary["weaknesses"] = _props_list(props, HSR.hasWeakness)
+    summary["elements"] = _props_list(props, HSR.hasElement)
+    summary["source"] = _props_one(props, HSR.sourceURL)
     return summary
 
-def print_enemy_summary(summary):
-    print("===============================================")
-    print(f"Враг: {summary.get('enemy')}")
+def summarize_enemy(graph, enemy_uri):
+    return summarize_enemy_props(enemy_uri, subject_props(graph, enemy_uri))
+
+def format_enemy_summary(summary):
+    lines = ["==============================================="]
+    lines.append(f"Враг: {summary.get('enemy')}")
     weaks = summary.get("weaknesses") or []
     if weaks:
-        print(f"  Слабости (hasWeakness): {', '.join(weaks)}")
+        lines.append(f"  Слабости (hasWeakness): {', '.join(weaks)}")
     else:
-        print("  Слабости (hasWeakness): —")
-    print()
-
-def find_character_uri_by_name(graph, name):
-    lname = name.strip().lower()
-    for subj in graph.subjects(RDF.type, HSR.Character):
-        if local_name(subj).lower() == lname:
-            return subj
-    for subj in graph.subjects(RDF.type, HSR.Character):
-        if lname in str(subj).lower():
-            return subj
-    return None
+        lines.append("  Слабости (hasWeakness): —")
+    lines.append("")
+    return "\n".join(lines)
+
+def print_enemy_summary(summary):
+    print(format_enemy_summary(summary))
+
+def iter_summaries(graph, grouped=None, only_characters=None):
+    """
+    Все сводки по персонажам и врагам за один проход по графу.
+    Генерирует пары (kind, summary), где kind — "character" или "enemy".
+    only_characters — если задано, сводки только по этим персонажам (враги выводятся все).
+    """
+    if grouped is None:
+        grouped = group_by_subject(graph)
+    if only_characters is not None:
+        only_characters = set(only_characters)
+
+    characters = []
+    enemies = []
+    for subj, props in grouped.items():
+        types = props.get(RDF.type, ())
+        if HSR.Character in types and (only_characters is None or subj in only_characters):
+            characters.append(subj)
+        if HSR.Enemies in types:
+            enemies.append(subj)
+
+    for subj in sorted(characters, key=local_name):
+        yield "character", summarize_character_props(subj, grouped[subj])
+    for subj in sorted(enemies, key=local_name):
+        yield "enemy", summarize_enemy_props(subj, grouped[subj])
+
+def render_summaries(records, fmt="text"):
+    """
+    Потоковый вывод сводок: генерирует строки в формате text, json или jsonl.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат вывода: {fmt}")
+
+    if fmt == "jsonl":
+        for kind, summary in records:
+            yield json.dumps({"type": kind, **summary}, ensure_ascii=False)
+        return
+
+    if fmt == "json":
+        yield "{"
+        current = None
+        pending = None
+        for kind, summary in records:
+            if kind != current:
+                if current is not None:
+                    yield "    " + pending
+                    yield "  ],"
+                    pending = None
+                yield f'  "{JSON_SECTIONS[kind]}": ['
+                current = kind
+            if pending is not None:
+                yield "    " + pending + ","
+            pending = json.dumps(summary, ensure_ascii=False)
+        if current is not None:
+            yield "    " + pending
+            yield "  ]"
+        yield "}"
+        return
+
+    any_characters = False
+    any_enemies = False
+    for kind, summary in records:
+        if kind == "character":
+            any_characters = True
+            yield format_summary(summary)
+        else:
+            if not any_characters:
+                yield "Не найдено ни одного hsr:Character в графе."
+                any_characters = True
+            any_enemies = True
+            yield format_enemy_summary(summary)
+    if not any_characters:
+        yield "Не найдено ни одного hsr:Character в графе."
+    if not any_enemies:
+        yield "Не найдено ни одного hsr:Enemies в графе."
+
+def find_character_uri_by_name(graph, name, index=None):
+    if index is None:
+        index = index_for(graph, classes=(HSR.Character,))
+    return index.resolve(name, cls=HSR.Character)
+
+def suggest_characters(graph, name, limit=3):
+    return [local_name(u) for u in index_for(graph, classes=(HSR.Character,)).suggest(name, HSR.Character, limit)]
 
 def main():
     ap = argparse.ArgumentParser(description="HSR character and enemy summary from ontology")
     ap.add_argument("ontology", nargs="?", default="data/hsr_ontology.rdf",
                     help="Путь к RDF-файлу (xml/ttl) с онтологией; по умолчанию data/hsr_ontology.rdf")
     ap.add_argument("--char", "-c", help="Локальное имя персонажа (например 'Seele')")
+    ap.add_argument("--format", "-f", choices=OUTPUT_FORMATS, default="text",
+                    help="Формат вывода: text, json или jsonl; по умолчанию text")
     args = ap.parse_args()
 
     g = Graph()
@@ -132,31 +242,21 @@ def main():
         print("Ошибка при загрузке графа:", e)
         return
 
-    # персонажи
+    # один персонаж или все; враги и их слабости — в любом случае
+    only_characters = None
     if args.char:
         uri = find_character_uri_by_name(g, args.char)
         if not uri:
             print(f"Персонаж '{args.char}' не найден.")
+            suggestions = suggest_characters(g, args.char)
+            if suggestions:
+                print(f"Возможно, имелось в виду: {', '.join(suggestions)}")
             return
-        summary = summarize_character(g, uri)
-        print_summary(summary)
-    else:
-        found = False
-        for subj in sorted(set(g.subjects(RDF.type, HSR.Character)), key=lambda x: local_name(x)):
-            found = True
-            summary = summarize_character(g, subj)
-            print_summary(summary)
-        if not found:
-            print("Не найдено ни одного hsr:Character в графе.")
-
-    # враги и их слабости
-    any_enemies = False
-    for enemy in sorted(set(g.subjects(RDF.type, HSR.Enemies)), key=lambda x: local_name(x)):
-        any_enemies = True
-        esum = summarize_enemy(g, enemy)
-        print_enemy_summary(esum)
-    if not any_enemies:
-        print("Не найдено ни одного hsr:Enemies в графе.")
+        only_characters = [uri]
+
+    # персонажи и враги одним проходом
+    for chunk in render_summaries(iter_summaries(g, only_characters=only_characters), args.format):
+        print(chunk)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
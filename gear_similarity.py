@@ -0,0 +1,145 @@
+"""
+Похожесть персонажей по снаряжению через разреженные матрицы инцидентности.
+
+Для каждого свойства снаряжения (реликвии, конусы, побочные статы) строится матрица
+персонажи × предметы. Запросы вида «у кого больше всего общих предметов с X» и
+«какие предметы чаще всего у персонажей пути P» считаются произведением матриц,
+без SPARQL-запроса на каждого персонажа, как в queries/3.py и queries/5.py.
+
+Использование:
+    python gear_similarity.py --char Seele
+    python gear_similarity.py --path Preservation --prop hasCavernRelic --prop hasPlanarRelic
+"""
+import argparse
+import numpy as np
+from rdflib import Graph, Namespace, RDF, RDFS
+from scipy import sparse
+
+HSR = Namespace("http://example.org/hsr-ontology#")
+ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+
+GEAR_PROPERTIES = {
+    "hasCavernRelic": HSR.hasCavernRelic,
+    "hasPlanarRelic": HSR.hasPlanarRelic,
+    "recommendedLightCone": HSR.recommendedLightCone,
+    "hasAlternativeLightCones": HSR.hasAlternativeLightCones,
+    "recommendedSubStats": HSR.recommendedSubStats,
+}
+
+
+def local_name(node):
+    s = str(node)
+    return s.split("#")[-1] if "#" in s else s.rstrip("/").split("/")[-1]
+
+
+def _top_k(scores, k, exclude=None):
+    scores = np.asarray(scores, dtype=np.float64).copy()
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        # все кандидаты не хуже k-го: среди равных на границе выбирает индекс, а не argpartition
+        values = scores[candidates]
+        candidates = candidates[values >= np.partition(values, -k)[-k]]
+    return candidates[np.lexsort((candidates, -scores[candidates]))[:k]].tolist()
+
+
+class GearMatrix:
+    def __init__(self, characters, items, matrices, paths):
+        self.characters = characters
+        self.items = items
+        self.char_index = {c: i for i, c in enumerate(characters)}
+        self.item_index = {it: i for i, it in enumerate(items)}
+        self.matrices = matrices    # имя свойства -> csr (персонажи × предметы)
+        self.paths = paths          # персонаж -> путь
+
+    @classmethod
+    def from_graph(cls, graph: Graph, properties=None):
+        properties = properties or GEAR_PROPERTIES
+        characters = sorted(set(graph.subjects(RDF.type, HSR.Character)), key=str)
+        char_index = {c: i for i, c in enumerate(characters)}
+
+        pairs = {name: [(s, o) for s, o in graph.subject_objects(prop) if s in char_index]
+                 for name, prop in properties.items()}
+        items = sorted({o for edges in pairs.values() for _, o in edges}, key=str)
+        item_index = {it: i for i, it in enumerate(items)}
+
+        matrices = {}
+        for name, edges in pairs.items():
+            edges = set(edges)
+            rows = [char_index[s] for s, _ in edges]
+            cols = [item_index[o] for _, o in edges]
+            matrices[name] = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                shape=(len(characters), len(items)),
+            )
+
+        paths = {c: p for c, p in graph.subject_objects(HSR.hasPath) if c in char_index}
+        return cls(characters, items, matrices, paths)
+
+    def incidence(self, properties=None):
+        """Бинарная матрица персонажи × предметы по выбранным свойствам (по умолчанию по всем)."""
+        names = properties or list(self.matrices)
+        m = sum(self.matrices[name] for name in names).tocsr()
+        m.data[:] = 1.0
+        return m
+
+    def shared_items(self, char, k: int = 5, properties=None):
+        """Персонажи с наибольшим числом общих предметов с char: [(персонаж, число общих)]."""
+        idx = self.char_index.get(char)
+        if idx is None:
+            return []
+        m = self.incidence(properties)
+        scores = (m @ m[idx].T).toarray().ravel()
+        return [(self.characters[i], int(scores[i])) for i in _top_k(scores, k, exclude=idx)]
+
+    def similarity_matrix(self, properties=None):
+        """Все пары сразу: персонажи × персонажи, число общих предметов."""
+        m = self.incidence(properties)
+        sim = (m @ m.T).tocsr()
+        sim.setdiag(0)
+        sim.eliminate_zeros()
+        return sim
+
+    def items_for_characters(self, mask, k: int = 10, properties=None):
+        """Самые частые предметы среди персонажей, отмеченных булевой маской."""
+        weights = np.asarray(mask, dtype=np.float32)
+        counts = self.incidence(properties).T @ weights
+        return [(self.items[i], int(counts[i])) for i in _top_k(counts, k)]
+
+    def items_for_path(self, path, k: int = 10, properties=None):
+        mask = np.array([self.paths.get(c) == path for c in self.characters])
+        return self.items_for_characters(mask, k, properties)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Похожесть персонажей и популярность снаряжения по матрицам инцидентности")
+    ap.add_argument("--char", help="Персонажи с общими предметами с этим персонажем")
+    ap.add_argument("--path", help="Популярные предметы у персонажей этого пути, например Preservation")
+    ap.add_argument("--prop", action="append", choices=list(GEAR_PROPERTIES), help="Учитывать только эти свойства")
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--ontology", default=ONTOLOGY_PATH)
+    args = ap.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology)
+    gear = GearMatrix.from_graph(g)
+
+    def pretty(node):
+        label = g.value(node, RDFS.label)
+        return str(label) if label else local_name(node)
+
+    if args.char:
+        print(f"Общие предметы с {args.char}:")
+        for char, count in gear.shared_items(HSR[args.char], args.top, args.prop):
+            print(f"  {pretty(char)} | {count}")
+    if args.path:
+        print(f"Популярные предметы пути {args.path}:")
+        for item, count in gear.items_for_path(HSR[args.path], args.top, args.prop):
+            print(f"  {pretty(item)} | {count}")
+    if not args.char and not args.path:
+        ap.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Статистика кардинальностей графа и порядок шаблонов BGP по ней.
+
+Для каждого свойства считается число триплетов и число различных субъектов и объектов,
+для каждого класса — число экземпляров. Планировщик оценивает, сколько строк даст шаблон
+при уже связанных переменных, и жадно выбирает самый избирательный из связанных с уже
+выбранными: например, <boss> hsr:hasWeakness ?e раньше, чем ?character a hsr:Character.
+Встроенный порядок rdflib учитывает только число несвязанных позиций в шаблоне.
+
+Статистика пишется рядом с онтологией (data/hsr_ontology.stats.json) при загрузке в main.py;
+для графа в памяти пересчитывается, когда граф изменился.
+
+Использование:
+    python graph_stats.py                      # сводка по свойствам и классам
+    python graph_stats.py --script queries/1.py  # выполнить скрипт с планировщиком и показать порядок
+"""
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import sys
+import weakref
+from collections import defaultdict
+from rdflib import Graph, RDF, Variable
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql import evaluate as sparql_evaluate
+
+from query_cache import graph_scope, graph_version
+from utils import file_sha1
+
+ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+PLANNER_EVAL = "hsr_planner"
+STATS_VERSION = 1
+ALL = "*"   # ключ сводки по всем свойствам
+
+
+def local_name(node):
+    s = str(node)
+    return s.split("#")[-1] if "#" in s else s.rstrip("/").split("/")[-1]
+
+
+def stats_path_for(ontology_path: str) -> str:
+    return os.path.splitext(ontology_path)[0] + ".stats.json"
+
+
+class PredicateStats:
+    __slots__ = ("triples", "subjects", "objects")
+
+    def __init__(self, triples=0, subjects=0, objects=0):
+        self.triples = triples
+        self.subjects = subjects
+        self.objects = objects
+
+
+class GraphStats:
+    def __init__(self, predicates=None, classes=None):
+        self.predicates = predicates or {}    # str(свойство) | ALL -> PredicateStats
+        self.classes = classes or {}          # str(класс) -> число экземпляров
+        self.source = None
+
+    @classmethod
+    def from_graph(cls, graph: Graph):
+        """Один проход по триплетам графа."""
+        counts = defaultdict(int)
+        subjects = defaultdict(set)
+        objects = defaultdict(set)
+        classes = defaultdict(set)
+        all_subjects, all_objects, total = set(), set(), 0
+        for s, p, o in graph.triples((None, None, None)):   # Dataset при итерации отдаёт четвёрки
+            counts[p] += 1
+            subjects[p].add(s)
+            objects[p].add(o)
+            all_subjects.add(s)
+            all_objects.add(o)
+            total += 1
+            if p == RDF.type:
+                classes[o].add(s)
+
+        predicates = {str(p): PredicateStats(counts[p], len(subjects[p]), len(objects[p])) for p in counts}
+        predicates[ALL] = PredicateStats(total, len(all_subjects), len(all_objects))
+        return cls(predicates, {str(c): len(members) for c, members in classes.items()})
+
+    def predicate(self, p):
+        if p is None:
+            return self.predicates.get(ALL, PredicateStats())
+        return self.predicates.get(str(p), PredicateStats())
+
+    def estimate(self, triple, bound=()):
+        """
+        Оценка числа строк шаблона (s, p, o), если переменные из bound уже связаны.
+        Связанная переменная — значение неизвестно при планировании, поэтому используется
+        среднее число триплетов на субъект/объект; константа rdf:type — точное число экземпляров.
+        """
+        s, p, o = triple
+
+        def known(term):
+            return not isinstance(term, Variable) or term in bound
+
+        s_known, o_known = known(s), known(o)
+        p_const = not isinstance(p, Variable)
+        stats = self.predicate(p if p_const else None)
+        if p_const and not stats.triples:
+            return 0.0
+
+        if p_const and p == RDF.type and not isinstance(o, Variable):
+            n = float(self.classes.get(str(o), 0))
+            return min(n, 1.0) if s_known else n
+
+        n = float(stats.triples)
+        if s_known:
+            n /= max(stats.subjects, 1)
+        if o_known:
+            n /= max(stats.objects, 1)
+        if not p_const and p in bound:
+            n /= max(len(self.predicates) - 1, 1)
+        return n
+
+    def order(self, triples, bound=()):
+        """
+        Жадный порядок шаблонов: на каждом шаге — шаблон с наименьшей оценкой среди
+        имеющих общую переменную с уже выбранными (чтобы не строить декартово произведение).
+        """
+        remaining = list(triples)
+        bound = set(bound)
+        ordered = []
+        while remaining:
+            connected = [t for t in remaining if bound & {n for n in t if isinstance(n, Variable)}]
+            candidates = connected or remaining
+            best = min(candidates, key=lambda t: self.estimate(t, bound))
+            remaining.remove(best)
+            ordered.append(best)
+            bound.update(n for n in best if isinstance(n, Variable))
+        return ordered
+
+    def to_dict(self):
+        return {
+            "version": STATS_VERSION,
+            "source": self.source,
+            "predicates": {p: [st.triples, st.subjects, st.objects] for p, st in self.predicates.items()},
+            "classes": self.classes,
+        }
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != STATS_VERSION:
+            raise ValueError(f"Неподдерживаемая версия статистики: {data.get('version')}")
+        stats = cls({p: PredicateStats(*v) for p, v in data["predicates"].items()}, data["classes"])
+        stats.source = data.get("source")
+        return stats
+
+
+def load_stats(ontology_path: str = ONTOLOGY_PATH, graph: Graph | None = None, stats_path: str | None = None):
+    """
+    Статистика для файла онтологии: с диска, если файл не менялся, иначе пересчёт и сохранение.
+    Если передан graph (загруженный из этого файла), статистика запоминается для него:
+    планировщик берёт её, пока граф не изменится, и не пересчитывает в памяти.
+    """
+    stats = _load_persisted(ontology_path, stats_path)
+    if stats is None:
+        if graph is None:
+            graph = Graph()
+            graph.parse(ontology_path)
+        stats = GraphStats.from_graph(graph)
+        stats.source = file_sha1(ontology_path)
+        stats.save(stats_path or stats_path_for(ontology_path))
+    if graph is not None:
+        _memory.setdefault(graph.store, {})[graph_scope(graph)] = (graph_version(graph), stats)
+    return stats
+
+
+def _load_persisted(ontology_path: str, stats_path: str | None = None):
+    """Статистика с диска, если она посчитана по текущей версии файла, иначе None."""
+    stats_path = stats_path or stats_path_for(ontology_path)
+    if not os.path.exists(ontology_path) or not os.path.exists(stats_path):
+        return None
+    try:
+        stats = GraphStats.load(stats_path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return stats if stats.source == file_sha1(ontology_path) else None
+
+
+_memory = weakref.WeakKeyDictionary()   # хранилище -> {graph_scope: (версия графа, GraphStats)}
+
+
+def stats_for(graph: Graph) -> GraphStats:
+    """
+    Статистика графа в памяти; пересчитывается после изменения графа. Сохранённая статистика
+    используется, только если граф зарегистрирован через load_stats для своего файла.
+    """
+    version = graph_version(graph)
+    per_store = _memory.setdefault(graph.store, {})
+    scope = graph_scope(graph)
+    cached = per_store.get(scope)
+    if cached is None or cached[0] != version:
+        cached = (version, GraphStats.from_graph(graph))
+        per_store[scope] = cached
+    return cached[1]
+
+
+def planner_eval(ctx, part):
+    """Custom eval rdflib: вычисляет BGP в порядке, выбранном по статистике."""
+    if part.name != "BGP" or len(part.triples) < 2:
+        raise NotImplementedError()
+    stats = stats_for(ctx.graph)
+    bound = {v for t in part.triples for v in t if isinstance(v, Variable) and ctx[v] is not None}
+    return sparql_evaluate.evalBGP(ctx, stats.order(part.triples, bound))
+
+
+@contextlib.contextmanager
+def planned():
+    was_enabled = PLANNER_EVAL in CUSTOM_EVALS
+    CUSTOM_EVALS[PLANNER_EVAL] = planner_eval
+    try:
+        yield
+    finally:
+        if not was_enabled:
+            CUSTOM_EVALS.pop(PLANNER_EVAL, None)
+
+
+def _short(term):
+    return f"?{term}" if isinstance(term, Variable) else local_name(term)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Статистика кардинальностей и порядок шаблонов BGP")
+    ap.add_argument("--script", help="Выполнить скрипт из queries/ с планировщиком и напечатать порядок шаблонов")
+    ap.add_argument("--ontology", default=ONTOLOGY_PATH)
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    if args.script:
+        def explain(ctx, part):
+            if part.name == "BGP" and len(part.triples) >= 2:
+                bound = {v for t in part.triples for v in t if isinstance(v, Variable) and ctx[v] is not None}
+                stats = stats_for(ctx.graph)
+                print("BGP:", file=sys.stderr)
+                for t in stats.order(part.triples, bound):
+                    print(f"  {' '.join(_short(n) for n in t)}  ~{stats.estimate(t, bound):.1f}", file=sys.stderr)
+                    bound.update(n for n in t if isinstance(n, Variable))
+            raise NotImplementedError()
+
+        CUSTOM_EVALS["hsr_planner_explain"] = explain
+        try:
+            with planned():
+                runpy.run_path(args.script, run_name="__main__")
+        finally:
+            CUSTOM_EVALS.pop("hsr_planner_explain", None)
+        return
+
+    stats = load_stats(args.ontology)
+    total = stats.predicate(None)
+    print(f"Триплетов: {total.triples}, субъектов: {total.subjects}, объектов: {total.objects}")
+    print("свойство | триплетов | субъектов | объектов")
+    ranked = sorted(((p, st) for p, st in stats.predicates.items() if p != ALL), key=lambda x: -x[1].triples)
+    for p, st in ranked[:args.top]:
+        print(f"{local_name(p)} | {st.triples} | {st.subjects} | {st.objects}")
+    print("класс | экземпляров")
+    for cls, n in sorted(stats.classes.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"{local_name(cls)} | {n}")
+
+
+if __name__ == "__main__":
+    main()
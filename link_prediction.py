@@ -0,0 +1,206 @@
+"""
+Предсказание связей по обученным эмбеддингам: рекомендации конусов, реликвий, участников команд.
+
+Для пакета запросов (персонаж, hsr:recommendedLightCone, ?) или (команда, hsr:hasSupport, ?)
+функция оценки модели считается сразу по всем кандидатам одним матричным проходом
+(EmbeddingStore.score_tails / score_heads). Кандидаты ограничены классом range свойства
+(для голов — классом domain) из ontology/build.py: конус не предложат в слоты персонажей.
+Известные триплеты отфильтровываются, из оставшихся выбирается топ-k через argpartition.
+
+Работает на артефакте embedding_store.py, без torch и pykeen.
+
+Использование:
+    python link_prediction.py recommendedLightCone --top 5               # для всех персонажей
+    python link_prediction.py recommendedLightCone --entity Seele
+    python link_prediction.py hasSupport --entity Seele --heads --top 5  # команды для персонажа
+"""
+import argparse
+import numpy as np
+
+from embedding_index import top_k_rows
+from embedding_store import SERVING_DIR, EmbeddingStore
+from ontology.build import HSR, PROPERTIES
+
+HSR_NS = str(HSR)
+DEFAULT_BATCH = 256     # строк запросов за один проход: TransE/RotatE строят (batch, кандидаты, dim)
+
+# IRI свойства -> IRI класса; sourceURL (литерал) не предсказывается
+DOMAINS = {str(HSR[name]): str(domain) for name, (domain, _) in PROPERTIES.items() if domain is not None}
+RANGES = {str(HSR[name]): str(range_) for name, (domain, range_) in PROPERTIES.items() if domain is not None}
+
+
+def local_name(node):
+    s = str(node)
+    return s.split("#")[-1] if "#" in s else s.rstrip("/").split("/")[-1]
+
+
+class LinkPredictor:
+    def __init__(self, store: EmbeddingStore, domains=DOMAINS, ranges=RANGES, batch_size: int = DEFAULT_BATCH):
+        self.store = store
+        self.domains = domains
+        self.ranges = ranges
+        self.batch_size = batch_size
+        self._known = None
+
+    @classmethod
+    def load(cls, directory: str = SERVING_DIR, **kwargs):
+        return cls(EmbeddingStore.load(directory), **kwargs)
+
+    def _class_ids(self, cls):
+        """id сущностей класса cls; None — без ограничения (класс не задан)."""
+        if cls is None:
+            return None
+        return self.store.entity_types.get(cls, np.empty(0, dtype=np.int64))
+
+    def tail_candidates(self, relation):
+        return self._class_ids(self.ranges.get(relation))
+
+    def head_candidates(self, relation):
+        return self._class_ids(self.domains.get(relation))
+
+    def _known_index(self):
+        """{(head, relation): [tail]} и {(relation, tail): [head]} по известным триплетам."""
+        if self._known is None:
+            tails, heads = {}, {}
+            for h, r, t in np.asarray(self.store.known_triples()).tolist():
+                tails.setdefault((h, r), []).append(t)
+                heads.setdefault((r, t), []).append(h)
+            self._known = (tails, heads)
+        return self._known
+
+    def _ids(self, uris, mapping, kind):
+        ids = [mapping.get(u) for u in uris]
+        missing = [u for u, i in zip(uris, ids) if i is None]
+        if missing:
+            raise KeyError(f"{kind} не найдены в эмбеддингах: {', '.join(local_name(u) for u in missing)}")
+        return np.array(ids, dtype=np.int64)
+
+    def _relation_ids(self, relations, n):
+        if isinstance(relations, str):
+            relations = [relations] * n
+        if len(relations) != n:
+            raise ValueError("Число отношений не совпадает с числом запросов.")
+        return list(relations), self._ids(relations, self.store.relation_to_id, "Отношения")
+
+    def _top(self, scores, candidates, known_rows, k):
+        """Топ-k по строкам scores (запросы × кандидаты) без известных ответов: [[(id, оценка)]]."""
+        n_entities = len(self.store.entities)
+        if candidates is None:
+            position = None
+        else:
+            position = np.full(n_entities, -1, dtype=np.int64)
+            position[candidates] = np.arange(len(candidates))
+        for row, known in enumerate(known_rows):
+            if not known:
+                continue
+            cols = np.asarray(known, dtype=np.int64)
+            if position is not None:
+                cols = position[cols]
+                cols = cols[cols >= 0]
+            scores[row, cols] = -np.inf
+
+        ids = np.arange(scores.shape[1]) if candidates is None else candidates
+        top = top_k_rows(scores, k)
+        results = []
+        for row in range(scores.shape[0]):
+            picked = [c for c in top[row] if np.isfinite(scores[row, c])]
+            results.append([(int(ids[c]), float(scores[row, c])) for c in picked])
+        return results
+
+    def _predict(self, anchors, relations, k, filter_known, by_head):
+        store = self.store
+        anchor_ids = self._ids(anchors, store.entity_to_id, "Сущности")
+        relation_uris, relation_ids = self._relation_ids(relations, len(anchors))
+        tails_known, heads_known = self._known_index() if filter_known else ({}, {})
+
+        # запросы с одним отношением — общий набор кандидатов и один проход на пакет
+        groups = {}
+        for row, rel in enumerate(relation_uris):
+            groups.setdefault(rel, []).append(row)
+
+        results = [None] * len(anchors)
+        for rel, rows in groups.items():
+            candidates = self.head_candidates(rel) if by_head else self.tail_candidates(rel)
+            if candidates is not None and not len(candidates):
+                for row in rows:
+                    results[row] = []
+                continue
+            for start in range(0, len(rows), self.batch_size):
+                chunk = np.array(rows[start:start + self.batch_size])
+                a, r = anchor_ids[chunk], relation_ids[chunk]
+                if by_head:
+                    scores = store.score_heads(r, a, candidates)
+                    known = [heads_known.get((ri, ai), ()) for ri, ai in zip(r.tolist(), a.tolist())]
+                else:
+                    scores = store.score_tails(a, r, candidates)
+                    known = [tails_known.get((ai, ri), ()) for ai, ri in zip(a.tolist(), r.tolist())]
+                scores = np.array(scores, dtype=np.float64)
+                for row, ranked in zip(chunk, self._top(scores, candidates, known, k)):
+                    results[row] = [(store.entity_labels[i], s) for i, s in ranked]
+        return results
+
+    def predict_tails(self, heads, relations, k: int = 10, filter_known: bool = True):
+        """
+        Топ-k хвостов для каждого (head, relation): [[(IRI, оценка)], ...] в порядке heads.
+        relations — одно IRI для всех запросов или по IRI на запрос.
+        """
+        return self._predict(list(heads), relations, k, filter_known, by_head=False)
+
+    def predict_heads(self, relations, tails, k: int = 10, filter_known: bool = True):
+        """Топ-k голов для каждого (relation, tail), например команд для персонажа по hasSupport."""
+        return self._predict(list(tails), relations, k, filter_known, by_head=True)
+
+    def recommend(self, relation, k: int = 10, filter_known: bool = True):
+        """Рекомендации для всех сущностей класса domain свойства: {IRI: [(IRI, оценка)]}."""
+        ids = self.head_candidates(relation)
+        if ids is None:
+            raise ValueError(f"У свойства {local_name(relation)} нет domain в онтологии.")
+        heads = [self.store.entity_labels[i] for i in ids]
+        return dict(zip(heads, self.predict_tails(heads, relation, k, filter_known)))
+
+
+def _print_ranked(title, ranked):
+    print(f"{title}:")
+    for uri, score in ranked:
+        print(f"  {local_name(uri)}: {score:.4f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Рекомендации по функции оценки модели эмбеддингов")
+    ap.add_argument("relation", help="Локальное имя свойства, например recommendedLightCone или hasSupport")
+    ap.add_argument("--entity", action="append", help="Локальное имя сущности (можно несколько раз); "
+                                                      "без него — весь класс domain свойства")
+    ap.add_argument("--heads", action="store_true", help="Предсказывать головы (?, relation, entity)")
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--all", action="store_true", help="Не отфильтровывать известные триплеты")
+    ap.add_argument("--dir", default=SERVING_DIR)
+    args = ap.parse_args()
+
+    predictor = LinkPredictor.load(args.dir)
+    relation = HSR_NS + args.relation
+    if relation not in predictor.store.relation_to_id:
+        print(f"Отношение {relation} не найдено в эмбеддингах.")
+        return
+
+    try:
+        if args.entity:
+            uris = [HSR_NS + name for name in args.entity]
+            if args.heads:
+                ranked = predictor.predict_heads(relation, uris, args.top, not args.all)
+            else:
+                ranked = predictor.predict_tails(uris, relation, args.top, not args.all)
+            results = dict(zip(uris, ranked))
+        elif args.heads:
+            ap.error("--heads требует --entity")
+        else:
+            results = predictor.recommend(relation, args.top, not args.all)
+    except (KeyError, ValueError) as e:
+        print(e.args[0])
+        return
+
+    for uri, ranked in sorted(results.items(), key=lambda x: local_name(x[0])):
+        _print_ranked(local_name(uri), ranked)
+
+
+if __name__ == "__main__":
+    main()
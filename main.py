@@ -1,13 +1,17 @@
 from rdflib import Graph
 from ontology.build import build_ontology
+from ontology.inference import materialize
 from parsers.character_parser import parse_characters
 from parsers.lightcone_parser import parse_light_cones
 from parsers.relics_parser import parse_relics
 from parsers.enemy_parser import parse_enemies
 from parsers.boss_parser import parse_bosses
 from parsers.team_parser import parse_teams
+from text_index import load_text_index
+from graph_stats import load_stats
 
 ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+INFERRED_PATH = "data/hsr_ontology_inferred.rdf"
 
 if __name__ == "__main__":
     build_ontology(ONTOLOGY_PATH)
@@ -24,3 +28,14 @@ if __name__ == "__main__":
 
     g.serialize(destination=ONTOLOGY_PATH, format="xml")
     print("Онтология обновлена.")
+
+    inferred = materialize(g)
+    inferred.bind("hsr", "http://example.org/hsr-ontology#")
+    inferred.serialize(destination=INFERRED_PATH, format="xml")
+    print(f"Выведено RDFS-триплетов: {len(inferred)}")
+
+    index = load_text_index(ONTOLOGY_PATH, g)
+    print(f"Полнотекстовый индекс: {len(index)} документов")
+
+    stats = load_stats(ONTOLOGY_PATH, g)
+    print(f"Статистика: {len(stats.predicates) - 1} свойств, {len(stats.classes)} классов")
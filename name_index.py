@@ -0,0 +1,192 @@
+"""
+Индекс имён сущностей онтологии: точный поиск, автодополнение по префиксу и нечёткий поиск.
+
+Строится один раз по локальным именам и rdfs:label для персонажей, световых конусов,
+сетов реликвий и врагов (включая боссов).
+"""
+import re
+import weakref
+from collections import defaultdict
+from rdflib import Graph, Namespace, RDF, RDFS, URIRef
+
+from query_cache import graph_scope, graph_version
+
+HSR = Namespace("http://example.org/hsr-ontology#")
+
+ENTITY_CLASSES = (HSR.Character, HSR.LightCone, HSR.Set, HSR.CavernRelics, HSR.PlanarRelics, HSR.Enemies)
+NGRAM = 3
+
+
+def local_name(node):
+    s = str(node)
+    if "#" in s:
+        return s.split("#")[-1]
+    return s.rstrip("/").split("/")[-1]
+
+
+def name_key(name: str) -> str:
+    """Ключ поиска: нижний регистр, всё кроме букв и цифр заменено пробелом."""
+    return re.sub(r"[\W_]+", " ", name.lower()).strip()
+
+
+def ngrams(key: str, n: int = NGRAM):
+    padded = f" {key} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "keys")
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()
+
+
+class NameIndex:
+    def __init__(self):
+        self._exact = defaultdict(set)      # key -> {uri}
+        self._types = defaultdict(set)      # uri -> {class}
+        self._names = defaultdict(set)      # uri -> {key}
+        self._grams = defaultdict(set)      # ngram -> {key}
+        self._gram_count = {}               # key -> число n-грамм
+        self._trie = _TrieNode()
+
+    @classmethod
+    def from_graph(cls, graph: Graph, classes=ENTITY_CLASSES):
+        index = cls()
+        wanted = set(classes)
+        labels = defaultdict(list)
+        for s, o in graph.subject_objects(RDFS.label):
+            labels[s].append(str(o))
+        for s, t in graph.subject_objects(RDF.type):
+            if t not in wanted or not isinstance(s, URIRef):
+                continue
+            index.add(s, local_name(s), t)
+            for label in labels.get(s, ()):
+                index.add(s, label, t)
+        return index
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, uri, name: str, cls=None):
+        key = name_key(name)
+        if not key:
+            return
+        if cls is not None:
+            self._types[uri].add(cls)
+        self._names[uri].add(key)
+        if uri in self._exact[key]:
+            return
+        self._exact[key].add(uri)
+
+        if key not in self._gram_count:
+            grams = ngrams(key)
+            self._gram_count[key] = len(grams)
+            for gram in grams:
+                self._grams[gram].add(key)
+            # в trie кладём ключ целиком и его хвосты с начала каждого слова,
+            # чтобы "imbibitor" находил "dan heng imbibitor lunae"
+            words = key.split(" ")
+            for i in range(len(words)):
+                self._insert(" ".join(words[i:]), key)
+
+    def _insert(self, text: str, key: str):
+        node = self._trie
+        for ch in text:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.keys.add(key)
+
+    def _filter(self, uris, cls):
+        if cls is None:
+            return set(uris)
+        return {u for u in uris if cls in self._types.get(u, ())}
+
+    def exact(self, name: str, cls=None):
+        return sorted(self._filter(self._exact.get(name_key(name), ()), cls), key=str)
+
+    def prefix(self, text: str, cls=None, limit: int = 10):
+        """Автодополнение: сущности, у которых имя или одно из его слов начинается с text."""
+        node = self._trie
+        for ch in name_key(text):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+
+        keys = set()
+        stack = [node]
+        while stack:
+            cur = stack.pop()
+            keys.update(cur.keys)
+            stack.extend(cur.children.values())
+
+        found = []
+        seen = set()
+        for key in sorted(keys, key=lambda k: (len(k), k)):
+            for uri in sorted(self._filter(self._exact[key], cls), key=str):
+                if uri in seen:
+                    continue
+                seen.add(uri)
+                found.append(uri)
+                if limit and len(found) >= limit:
+                    return found
+        return found
+
+    def fuzzy(self, name: str, cls=None, limit: int = 5, threshold: float = 0.3):
+        """Нечёткий поиск по коэффициенту Дайса на n-граммах; возвращает [(uri, score)]."""
+        query = ngrams(name_key(name))
+        shared = defaultdict(int)
+        for gram in query:
+            for key in self._grams.get(gram, ()):
+                shared[key] += 1
+
+        best = {}
+        for key, common in shared.items():
+            score = 2.0 * common / (len(query) + self._gram_count[key])
+            if score < threshold:
+                continue
+            for uri in self._filter(self._exact[key], cls):
+                if score > best.get(uri, 0.0):
+                    best[uri] = score
+
+        ranked = sorted(best.items(), key=lambda x: (-x[1], str(x[0])))
+        return ranked[:limit] if limit else ranked
+
+    def resolve(self, name: str, cls=None):
+        """
+        Лучшее совпадение: точное имя, затем префикс слова. Нечёткий поиск сюда не входит —
+        опечатка не должна молча превращаться в другую сущность; см. suggest.
+        """
+        hits = self.exact(name, cls)
+        if hits:
+            return hits[0]
+        hits = self.prefix(name, cls, limit=1)
+        if hits:
+            return hits[0]
+        return None
+
+    def suggest(self, name: str, cls=None, limit: int = 3):
+        """Варианты для сообщения «не найдено»: нечёткие совпадения."""
+        return [uri for uri, _ in self.fuzzy(name, cls, limit=limit)]
+
+    def types_of(self, uri):
+        return set(self._types.get(uri, ()))
+
+
+_indexes = weakref.WeakKeyDictionary()     # store -> {(graph_scope, classes): (версия графа, NameIndex)}
+
+
+def index_for(graph: Graph, classes=ENTITY_CLASSES) -> NameIndex:
+    """Индекс имён графа; строится один раз и перестраивается только после изменения графа."""
+    classes = tuple(classes)
+    version = graph_version(graph)
+    # именованные графы одного хранилища индексируются раздельно
+    key = (graph_scope(graph), classes)
+    per_store = _indexes.setdefault(graph.store, {})
+    cached = per_store.get(key)
+    if cached is None or cached[0] != version:
+        cached = (version, NameIndex.from_graph(graph, classes))
+        per_store[key] = cached
+    return cached[1]
@@ -12,11 +12,53 @@ def normalize(term):
     s = re.sub(r'_+', '_', s)
     return s.strip('_')
 
-def build_ontology(path):
+PATHS = [
+    "The Preservation", "The Hunt", "The Harmony", "The Abundance",
+    "The Nihility", "The Erudition", "The Destruction", "The Remembrance"
+]
+
+ELEMENTS = ["Physical", "Fire", "Ice", "Lightning", "Quantum", "Imaginary", "Wind"]
+
+CHARACTERISTICS = [
+    "HP", "HP_percent", "ATK", "ATK_percent", "DEF", "DEF_percent", "Speed", "CritRate", "CritDMG",
+    "BreakEffect", "EffectHitRate", "EffectRES", "EnergyRegen"
+]
+
+
+# свойство -> (domain, range)
+PROPERTIES = {
+    "hasPath": (HSR.Character, HSR.Path),
+    "hasElement": (HSR.Character, HSR.Element),
+    "hasCavernRelic": (HSR.Character, HSR.CavernRelics),
+    "hasPlanarRelic": (HSR.Character, HSR.PlanarRelics),
+    "hasSubCharacteristics": (HSR.Character, HSR.Characteristic),
+    "recommendedLightCone": (HSR.Character, HSR.LightCone),
+    "hasWeakness": (HSR.Enemies, HSR.Element),
+    "recommendedSubStats": (HSR.Character, HSR.Characteristic),
+    "recommendedMainStatBody": (HSR.Character, HSR.Characteristic),
+    "recommendedMainStatFeet": (HSR.Character, HSR.Characteristic),
+    "recommendedMainStatSphere": (HSR.Character, HSR.Characteristic),
+    "recommendedMainStatRope": (HSR.Character, HSR.Characteristic),
+    "lightConeHasPath": (HSR.LightCone, HSR.Path),
+    "hasAlternativeLightCones": (HSR.Character, HSR.LightCone),
+    # роли в командах (parsers/team_parser.py)
+    "hasDPS": (HSR.Team, HSR.Character),
+    "hasSupport": (HSR.Team, HSR.Character),
+    "hasSustain": (HSR.Team, HSR.Character),
+    "hasMember": (HSR.Team, HSR.Character),
+    # sourceURL есть у всех сущностей, поэтому без domain
+    "sourceURL": (None, RDFS.Literal),
+}
+
+# не больше одного значения у сущности (owl:FunctionalProperty); остальные свойства многозначны
+FUNCTIONAL_PROPERTIES = {"hasPath", "hasElement", "lightConeHasPath", "sourceURL"}
+
+
+def ontology_graph():
     g = Graph()
     g.bind("hsr", HSR)
 
-    base_classes = ["Character", "Enemies", "LightCone", "Path", "Element", "Set", "Characteristic"]
+    base_classes = ["Character", "Enemies", "LightCone", "Path", "Element", "Set", "Characteristic", "Team"]
     for cls_name in base_classes:
         g.add((HSR[cls_name], RDF.type, RDFS.Class))
 
@@ -27,59 +69,37 @@ def build_ontology(path):
 
     g.add((HSR.Characteristic, RDF.type, RDFS.Class))
 
-    g.add((HSR.Element, RDFS.subClassOf, HSR.LightCone))
-    g.add((HSR.Element, RDFS.subClassOf, HSR.Character))
-    g.add((HSR.Element, RDFS.subClassOf, HSR.Enemies))
-    g.add((HSR.Path, RDFS.subClassOf, HSR.LightCone))
-    g.add((HSR.Path, RDFS.subClassOf, HSR.Character))
-
-    pathes = [
-        "The Preservation", "The Hunt", "The Harmony", "The Abundance",
-        "The Nihility", "The Erudition", "The Destruction", "The Remembrance"
-    ]
-    for p in pathes:
+    # Element и Path связаны с персонажами, конусами и врагами через свойства
+    # (hasElement, hasPath, lightConeHasPath, hasWeakness), а не через subClassOf:
+    # иначе RDFS-вывод (ontology/inference.py) делает каждый элемент персонажем.
+
+    for p in PATHS:
         g.add((HSR[normalize(p)], RDF.type, HSR.Path))
 
-    elements = ["Physical", "Fire", "Ice", "Lightning", "Quantum", "Imaginary", "Wind"]
-    for e in elements:
+    for e in ELEMENTS:
         g.add((HSR[normalize(e)], RDF.type, HSR.Element))
 
-    characteristics = [
-        "HP", "HP_percent", "ATK", "ATK_percent", "DEF", "DEF_percent", "Speed", "CritRate", "CritDMG",
-        "BreakEffect", "EffectHitRate", "EffectRES", "EnergyRegen"
-    ]
-    for c in characteristics:
+    for c in CHARACTERISTICS:
         g.add((HSR[normalize(c)], RDF.type, HSR.Characteristic))
 
-    properties = {
-        "hasPath": (HSR.Character, HSR.Path),
-        "hasElement": (HSR.Character, HSR.Element),
-        "hasCavernRelic": (HSR.Character, HSR.CavernRelics),
-        "hasPlanarRelic": (HSR.Character, HSR.PlanarRelics),
-        "hasSubCharacteristics": (HSR.Character, HSR.Characteristic),
-        "recommendedLightCone": (HSR.Character, HSR.LightCone),
-        "hasWeakness": (HSR.Enemies, HSR.Element),
-        "recommendedSubStats": (HSR.Character, HSR.Characteristic),
-        "recommendedMainStatBody": (HSR.Character, HSR.Characteristic),
-        "recommendedMainStatFeet": (HSR.Character, HSR.Characteristic),
-        "recommendedMainStatSphere": (HSR.Character, HSR.Characteristic),
-        "recommendedMainStatRope": (HSR.Character, HSR.Characteristic),
-        "lightConeHasPath": (HSR.LightCone, HSR.Path),
-        "hasAlternativeLightCones": (HSR.Character, HSR.LightCone),
-        "sourceURL": (HSR.Set, RDFS.Literal),  
-    }
-
-    for prop_name, (domain, range_) in properties.items():
+    for prop_name, (domain, range_) in PROPERTIES.items():
         prop_uri = HSR[prop_name]
       
         if prop_name == "sourceURL":
             g.add((prop_uri, RDF.type, OWL.DatatypeProperty))
-            g.add((prop_uri, RDFS.domain, domain))
-          
+
         else:
             g.add((prop_uri, RDF.type, OWL.ObjectProperty))
             g.add((prop_uri, RDFS.domain, domain))
             g.add((prop_uri, RDFS.range, range_))
 
+        if prop_name in FUNCTIONAL_PROPERTIES:
+            g.add((prop_uri, RDF.type, OWL.FunctionalProperty))
+
+    return g
+
+
+def build_ontology(path):
+    g = ontology_graph()
     g.serialize(destination=path, format="xml")
     print("Онтология создана.")
\ No newline at end of file
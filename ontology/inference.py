@@ -0,0 +1,136 @@
+"""
+Материализация RDFS-выводов: subClassOf, subPropertyOf, domain и range.
+
+Выводы считаются прямым выводом (forward chaining) один раз после загрузки и кладутся
+в отдельный именованный граф, поэтому запросам не нужен reasoner во время выполнения.
+Добавление новых триплетов обрабатывается инкрементально: по правилам прогоняются
+только они и то, что из них следует.
+"""
+import os
+from collections import deque
+from rdflib import Dataset, Graph, Literal, RDF, RDFS, URIRef
+
+ASSERTED_GRAPH = URIRef("http://example.org/hsr-ontology/graph/asserted")
+INFERRED_GRAPH = URIRef("http://example.org/hsr-ontology/graph/inferred")
+
+
+class RDFSMaterializer:
+    def __init__(self, asserted: Graph, inferred: Graph | None = None):
+        self.asserted = asserted
+        self.inferred = inferred if inferred is not None else Graph()
+
+    def _triples(self, pattern):
+        yield from self.asserted.triples(pattern)
+        yield from self.inferred.triples(pattern)
+
+    def _objects(self, subject, predicate):
+        for _, _, o in self._triples((subject, predicate, None)):
+            yield o
+
+    def _subjects(self, predicate, obj):
+        for s, _, _ in self._triples((None, predicate, obj)):
+            yield s
+
+    def _known(self, triple):
+        return triple in self.asserted or triple in self.inferred
+
+    def run(self, new_triples=None) -> int:
+        """
+        Прогоняет правила по new_triples (уже добавленным в asserted) или по всему графу.
+        Возвращает число новых выведенных триплетов.
+        """
+        queue = deque(self.asserted if new_triples is None else new_triples)
+        added = 0
+
+        def infer(triple):
+            nonlocal added
+            if self._known(triple):
+                return
+            self.inferred.add(triple)
+            queue.append(triple)
+            added += 1
+
+        while queue:
+            s, p, o = queue.popleft()
+
+            # rdfs9: тип наследуется по subClassOf
+            if p == RDF.type:
+                for sup in list(self._objects(o, RDFS.subClassOf)):
+                    infer((s, RDF.type, sup))
+
+            # rdfs11 + rdfs9 для нового ребра иерархии классов
+            elif p == RDFS.subClassOf:
+                for sup in list(self._objects(o, RDFS.subClassOf)):
+                    infer((s, RDFS.subClassOf, sup))
+                for sub in list(self._subjects(RDFS.subClassOf, s)):
+                    infer((sub, RDFS.subClassOf, o))
+                for inst in list(self._subjects(RDF.type, s)):
+                    infer((inst, RDF.type, o))
+
+            # rdfs5 + rdfs7 для нового ребра иерархии свойств
+            elif p == RDFS.subPropertyOf:
+                for sup in list(self._objects(o, RDFS.subPropertyOf)):
+                    infer((s, RDFS.subPropertyOf, sup))
+                for sub in list(self._subjects(RDFS.subPropertyOf, s)):
+                    infer((sub, RDFS.subPropertyOf, o))
+                for x, _, y in list(self._triples((None, s, None))):
+                    infer((x, o, y))
+
+            # rdfs2 / rdfs3 для новой декларации domain / range
+            elif p == RDFS.domain:
+                for x, _, _ in list(self._triples((None, s, None))):
+                    infer((x, RDF.type, o))
+            elif p == RDFS.range:
+                for _, _, y in list(self._triples((None, s, None))):
+                    if not isinstance(y, Literal):
+                        infer((y, RDF.type, o))
+
+            # rdfs7, rdfs2, rdfs3 для самого триплета
+            for sup in list(self._objects(p, RDFS.subPropertyOf)):
+                infer((s, sup, o))
+            for cls in list(self._objects(p, RDFS.domain)):
+                infer((s, RDF.type, cls))
+            if not isinstance(o, Literal):
+                for cls in list(self._objects(p, RDFS.range)):
+                    infer((o, RDF.type, cls))
+
+        return added
+
+    def add(self, triples) -> int:
+        """Добавляет триплеты в asserted и инкрементально досчитывает выводы."""
+        fresh = [t for t in triples if t not in self.asserted]
+        for t in fresh:
+            self.asserted.add(t)
+        return self.run(fresh)
+
+    def rebuild(self) -> int:
+        """Полный пересчёт, нужен после удаления триплетов."""
+        self.inferred.remove((None, None, None))
+        return self.run()
+
+
+def materialize(graph: Graph, inferred: Graph | None = None) -> Graph:
+    """Считает RDFS-замыкание графа и возвращает граф только с выведенными триплетами."""
+    reasoner = RDFSMaterializer(graph, inferred)
+    reasoner.run()
+    return reasoner.inferred
+
+
+def load_with_inference(path: str, format: str | None = "xml", inferred_path: str | None = None) -> Dataset:
+    """
+    Загружает онтологию в Dataset: исходные триплеты в ASSERTED_GRAPH, выводы в INFERRED_GRAPH.
+    Запросы к самому Dataset видят объединение обоих графов.
+    Если inferred_path указан и существует, выводы читаются из него, иначе считаются заново.
+    """
+    ds = Dataset(default_union=True)
+    ds.bind("hsr", "http://example.org/hsr-ontology#")
+    asserted = ds.graph(ASSERTED_GRAPH)
+    asserted.parse(path, format=format)
+    inferred = ds.graph(INFERRED_GRAPH)
+
+    if inferred_path and os.path.exists(inferred_path):
+        inferred.parse(inferred_path, format=format)
+        return ds
+
+    materialize(asserted, inferred)
+    return ds
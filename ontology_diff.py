@@ -0,0 +1,246 @@
+"""
+Разница между двумя версиями онтологии (например, до и после очередного парсинга).
+
+Обе версии приводятся к каноническому отсортированному N-Triples, сортировка внешняя —
+кусками с последующим слиянием, поэтому память ограничена размером куска. RDF/XML и другие
+форматы один раз перегоняются в N-Triples на диск потоком, без построения Graph в памяти.
+Исключение — файлы с blank nodes: для детерминированного переименования blank nodes
+нужен весь граф, такие файлы разбираются целиком. Затем два отсортированных потока сливаются
+за один проход, изменения группируются по субъекту и классу и пишутся в JSON.
+
+Использование:
+    python ontology_diff.py old/hsr_ontology.rdf data/hsr_ontology.rdf --out delta.json
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import sys
+import tempfile
+from rdflib import BNode, Graph
+from rdflib.compare import to_canonical_graph
+from rdflib.plugins.serializers.nt import _nt_row
+from rdflib.store import Store
+from rdflib.util import guess_format
+
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+DEFAULT_CHUNK = 200_000
+
+
+def _split(line: str):
+    """Строка N-Triples -> (subject, predicate, object) в синтаксисе N-Triples."""
+    s, p, rest = line.split(" ", 2)
+    return s, p, rest[:-2] if rest.endswith(" .") else rest
+
+
+def _nt_line(triple) -> str:
+    # экранирование как у сериализатора N-Triples: переводы строк в литералах не рвут строку
+    return _nt_row(triple).rstrip("\n")
+
+
+def _nt_lines(graph: Graph):
+    for triple in graph:
+        yield _nt_line(triple)
+
+
+class _NTriplesSink(Store):
+    """Хранилище rdflib без хранения: каждый добавленный парсером триплет сразу пишется строкой N-Triples."""
+
+    def __init__(self, out):
+        super().__init__()
+        self.out = out
+        self.has_bnodes = False
+
+    def add(self, triple, context, quoted=False):
+        if any(isinstance(t, BNode) for t in triple):
+            self.has_bnodes = True
+        self.out.write(_nt_line(triple))
+        self.out.write("\n")
+
+    def __len__(self, context=None):
+        return 0
+
+
+def to_ntriples(path: str, out_path: str, format: str) -> bool:
+    """Потоковая перегонка файла в N-Triples; False, если в нём есть blank nodes."""
+    with open(out_path, "w", encoding="utf-8") as out:
+        sink = _NTriplesSink(out)
+        Graph(store=sink).parse(path, format=format)
+    return not sink.has_bnodes
+
+
+def _read_nt(path: str, chunk_size: int):
+    with open(path, encoding="utf-8") as f:
+        while True:
+            chunk = list(itertools.islice(f, chunk_size))
+            if not chunk:
+                break
+            g = Graph()
+            g.parse(data="".join(chunk), format="nt")
+            if any(isinstance(t, BNode) for triple in g for t in triple):
+                raise ValueError("Blank nodes в N-Triples нельзя канонизировать по частям; "
+                                 "сохраните файл в другом формате или без blank nodes.")
+            yield from _nt_lines(g)
+
+
+def iter_canonical_lines(path: str, format: str | None = None, chunk_size: int = DEFAULT_CHUNK,
+                         workdir: str | None = None):
+    """
+    Триплеты файла строками канонического N-Triples (без сортировки).
+    N-Triples читаются кусками по chunk_size строк. Остальные форматы сначала потоком
+    перегоняются во временный N-Triples в workdir; если в файле есть blank nodes,
+    он разбирается целиком и канонизируется (память растёт с размером файла).
+    """
+    format = format or guess_format(path) or "xml"
+    if format in ("nt", "nt11", "ntriples"):
+        yield from _read_nt(path, chunk_size)
+        return
+
+    fd, nt_path = tempfile.mkstemp(suffix=".nt", dir=workdir)
+    os.close(fd)
+    try:
+        if to_ntriples(path, nt_path, format):
+            with open(nt_path, encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip("\n")
+            return
+    finally:
+        os.remove(nt_path)
+
+    g = Graph()
+    g.parse(path, format=format)
+    yield from _nt_lines(to_canonical_graph(g))
+
+
+def external_sort(lines, workdir: str, chunk_size: int = DEFAULT_CHUNK):
+    """Внешняя сортировка с удалением дублей: отсортированные куски на диске + heapq.merge."""
+    runs = []
+    while True:
+        chunk = sorted(set(itertools.islice(lines, chunk_size)))
+        if not chunk:
+            break
+        fd, run_path = tempfile.mkstemp(suffix=".nt", dir=workdir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(chunk))
+            f.write("\n")
+        runs.append(run_path)
+
+    files = [open(p, encoding="utf-8") for p in runs]
+    try:
+        previous = None
+        for line in heapq.merge(*((l.rstrip("\n") for l in f) for f in files)):
+            if line != previous:
+                yield line
+                previous = line
+    finally:
+        for f in files:
+            f.close()
+        for p in runs:
+            os.remove(p)
+
+
+def _by_subject(lines):
+    for subject, group in itertools.groupby(lines, key=lambda l: l.split(" ", 1)[0]):
+        yield subject, list(group)
+
+
+def diff_sorted(old_lines, new_lines):
+    """
+    Слияние двух отсортированных потоков, сгруппированных по субъекту.
+    Для изменившихся субъектов генерирует (subject, классы, статус, удалённые строки, добавленные строки),
+    статус — "added", "removed" или "changed".
+    """
+    old_iter = _by_subject(old_lines)
+    new_iter = _by_subject(new_lines)
+    old = next(old_iter, None)
+    new = next(new_iter, None)
+
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            subject, old_group, new_group = old[0], old[1], []
+            old = next(old_iter, None)
+        elif old is None or new[0] < old[0]:
+            subject, old_group, new_group = new[0], [], new[1]
+            new = next(new_iter, None)
+        else:
+            subject, old_group, new_group = old[0], old[1], new[1]
+            old = next(old_iter, None)
+            new = next(new_iter, None)
+
+        if old_group == new_group:
+            continue
+        if not old_group:
+            status = "added"
+        elif not new_group:
+            status = "removed"
+        else:
+            status = "changed"
+        old_set, new_set = set(old_group), set(new_group)
+        classes = sorted({o for _, p, o in map(_split, new_group or old_group) if p == RDF_TYPE})
+        yield subject, classes, status, sorted(old_set - new_set), sorted(new_set - old_set)
+
+
+def write_delta(old_path, new_path, out, chunk_size: int = DEFAULT_CHUNK, workdir: str | None = None):
+    """Пишет JSON-дельту в поток out, не держа в памяти список изменений; возвращает сводку."""
+    summary = {"added_triples": 0, "removed_triples": 0, "subjects": {"added": 0, "removed": 0, "changed": 0}}
+    by_class = {}
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        old_sorted = external_sort(iter_canonical_lines(old_path, chunk_size=chunk_size, workdir=tmp), tmp, chunk_size)
+        new_sorted = external_sort(iter_canonical_lines(new_path, chunk_size=chunk_size, workdir=tmp), tmp, chunk_size)
+
+        out.write('{\n  "old": %s,\n  "new": %s,\n  "changes": [' % (json.dumps(old_path), json.dumps(new_path)))
+        first = True
+        for subject, classes, status, removed, added in diff_sorted(old_sorted, new_sorted):
+            record = {
+                "subject": subject,
+                "classes": classes,
+                "status": status,
+                "removed": [list(_split(l)[1:]) for l in removed],
+                "added": [list(_split(l)[1:]) for l in added],
+            }
+            out.write(("\n    " if first else ",\n    ") + json.dumps(record, ensure_ascii=False))
+            first = False
+
+            summary["added_triples"] += len(added)
+            summary["removed_triples"] += len(removed)
+            summary["subjects"][status] += 1
+            for cls in classes or ["(untyped)"]:
+                stats = by_class.setdefault(cls, {"added": [], "removed": [], "changed": 0})
+                if status == "changed":
+                    stats["changed"] += 1
+                else:
+                    stats[status].append(subject)
+
+        summary["by_class"] = by_class
+        out.write("\n  ],\n  \"summary\": ")
+        out.write(json.dumps(summary, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        out.write("\n}\n")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Разница между двумя версиями онтологии в виде JSON-дельты")
+    ap.add_argument("old", help="Старая версия (rdf/xml, ttl, nt ...)")
+    ap.add_argument("new", help="Новая версия")
+    ap.add_argument("--out", help="Куда записать JSON; по умолчанию stdout")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK, help="Строк в одном куске внешней сортировки")
+    args = ap.parse_args()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            summary = write_delta(args.old, args.new, f, args.chunk_size)
+    else:
+        summary = write_delta(args.old, args.new, sys.stdout, args.chunk_size)
+
+    print(f"+{summary['added_triples']} / -{summary['removed_triples']} триплетов; "
+          f"субъекты: {summary['subjects']}", file=sys.stderr)
+    for cls, stats in sorted(summary["by_class"].items()):
+        if stats["added"] or stats["removed"]:
+            print(f"  {cls}: новых {len(stats['added'])}, удалённых {len(stats['removed'])}, "
+                  f"изменённых {stats['changed']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
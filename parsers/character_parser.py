@@ -85,7 +85,6 @@ def _parse_builds_page(graph: Graph, char_uri, page_url: str):
         name = cavern_a.text.strip()
         href = cavern_a.get("href")
         uri = HSR[normalize(name)]
-        graph.add((uri, RDF.type, HSR.Set))
         graph.add((uri, RDF.type, HSR.CavernRelics))
         graph.add((uri, RDFS.label, Literal(name)))
         if href:
@@ -96,7 +95,6 @@ def _parse_builds_page(graph: Graph, char_uri, page_url: str):
         name = planar_a.text.strip()
         href = planar_a.get("href")
         uri = HSR[normalize(name)]
-        graph.add((uri, RDF.type, HSR.Set))
         graph.add((uri, RDF.type, HSR.PlanarRelics))
         graph.add((uri, RDFS.label, Literal(name)))
         if href:
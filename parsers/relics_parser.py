@@ -70,7 +70,6 @@ def parse_relics(graph: Graph, url: str) -> Graph:
             norm_name = normalize(name)
             set_uri = HSR[norm_name]
 
-            graph.add((set_uri, RDF.type, HSR.Set))
             graph.add((set_uri, RDF.type, relic_class))
 
             effect_text = ""
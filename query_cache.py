@@ -0,0 +1,203 @@
+"""
+Кэш результатов SPARQL-запросов.
+
+Ключ — (текст запроса, initBindings, граф хранилища, хэш его содержимого). Граф задаётся
+graph_scope: именованные графы одного Dataset и их объединение кэшируются раздельно.
+Записи хранятся в памяти
+с вытеснением LRU и, по желанию, на диске. Любое изменение графа (add/addN/remove)
+меняет его версию, хэш пересчитывается, и старые записи больше не находятся.
+"""
+import hashlib
+import os
+import pickle
+import weakref
+from collections import OrderedDict
+from rdflib import Dataset, Graph
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.query import Result
+
+DEFAULT_MAX_ENTRIES = 256
+
+_versions = weakref.WeakKeyDictionary()  # store -> счётчик изменений
+
+
+def _bump(store):
+    _versions[store] = _versions.get(store, 0) + 1
+
+
+def _watch_store(store):
+    """Оборачивает методы хранилища, чтобы каждое изменение увеличивало версию графа."""
+    if store in _versions:
+        return
+    _versions[store] = 0
+
+    for name in ("add", "addN", "remove"):
+        original = getattr(store, name)
+
+        def wrapper(*args, _original=original, **kwargs):
+            _bump(store)
+            return _original(*args, **kwargs)
+
+        setattr(store, name, wrapper)
+
+
+def graph_version(graph: Graph) -> int:
+    _watch_store(graph.store)
+    return _versions[graph.store]
+
+
+def graph_scope(graph: Graph) -> tuple:
+    """
+    Какую часть хранилища видит запрос к graph: (идентификатор графа, объединение ли это).
+    Графы одного хранилища (именованные графы Dataset и сам Dataset) различаются только этим.
+    """
+    if getattr(graph, "default_union", False):
+        return None, True
+    if isinstance(graph, Dataset):
+        return DATASET_DEFAULT_GRAPH_ID, False
+    return graph.identifier, False
+
+
+def graph_content_hash(graph: Graph) -> str:
+    """Хэш содержимого, не зависящий от порядка триплетов."""
+    acc = 0
+    for triple in graph:
+        line = " ".join(term.n3() for term in triple)
+        acc = (acc + int.from_bytes(hashlib.sha1(line.encode("utf-8")).digest()[:16], "big")) % (1 << 128)
+    return f"{len(graph)}-{acc:032x}"
+
+
+def _bindings_key(init_bindings):
+    if not init_bindings:
+        return ""
+    return repr(sorted((str(k), v.n3() if hasattr(v, "n3") else repr(v)) for k, v in init_bindings.items()))
+
+
+def _freeze(result: Result):
+    if result.type != "SELECT":
+        raise ValueError(f"Кэшируются только SELECT-запросы, получен {result.type}")
+    return list(result.vars or []), [dict(b) for b in result.bindings]
+
+
+def _thaw(frozen) -> Result:
+    variables, bindings = frozen
+    result = Result("SELECT")
+    result.vars = list(variables)
+    result.bindings = [dict(b) for b in bindings]
+    return result
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, cache_dir: str | None = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._hashes = weakref.WeakKeyDictionary()  # store -> {graph_scope: (версия, хэш)}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def content_hash(self, graph: Graph) -> str:
+        version = graph_version(graph)
+        scope = graph_scope(graph)
+        memos = self._hashes.setdefault(graph.store, {})
+        memo = memos.get(scope)
+        if memo is not None and memo[0] == version:
+            return memo[1]
+        digest = graph_content_hash(graph)
+        if memo is not None and memo[1] != digest:
+            self._drop_hash(memo[1])
+        memos[scope] = (version, digest)
+        return digest
+
+    def key(self, graph: Graph, query: str, init_bindings=None, digest: str | None = None, **kwargs) -> str:
+        if digest is None:
+            digest = self.content_hash(graph)
+        extra = repr(sorted((k, sorted(v.items()) if isinstance(v, dict) else v) for k, v in kwargs.items()))
+        raw = "\x00".join((query.strip(), _bindings_key(init_bindings), extra, repr(graph_scope(graph)), digest))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def query(self, graph: Graph, query: str, initBindings=None, **kwargs) -> Result:
+        digest = self.content_hash(graph)
+        key = self.key(graph, query, initBindings, digest, **kwargs)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _thaw(entry[1])
+
+        frozen = self._load(key)
+        if frozen is not None:
+            self._remember(key, digest, frozen)
+            self.hits += 1
+            return _thaw(frozen)
+
+        self.misses += 1
+        result = graph.query(query, initBindings=initBindings, **kwargs)
+        if result.type != "SELECT":
+            return result
+        frozen = _freeze(result)
+        self._remember(key, digest, frozen)
+        self._store(key, frozen)
+        return _thaw(frozen)
+
+    def clear(self):
+        self._entries.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, digest, frozen):
+        self._entries[key] = (digest, frozen)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _drop_hash(self, digest):
+        # ключи памяти строятся из хэша, поэтому после изменения графа старые записи
+        # недостижимы; выбрасываем их сразу, не дожидаясь LRU
+        stale = [k for k, (d, _) in self._entries.items() if d == digest]
+        for k in stale:
+            del self._entries[k]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _store(self, key, frozen):
+        if not self.cache_dir:
+            return
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(frozen, f)
+        os.replace(tmp, self._path(key))
+
+
+_default_cache = None
+
+
+def cached_query(graph: Graph, query: str, initBindings=None, cache: QueryCache | None = None, **kwargs) -> Result:
+    """Замена graph.query(...) с общим кэшем процесса."""
+    global _default_cache
+    if cache is None:
+        if _default_cache is None:
+            _default_cache = QueryCache(cache_dir=os.environ.get("HSR_QUERY_CACHE_DIR") or None)
+        cache = _default_cache
+    return cache.query(graph, query, initBindings=initBindings, **kwargs)
@@ -0,0 +1,260 @@
+"""
+Профилирование SPARQL-запросов: время по фазам (parse / translate / evaluate),
+число решений на каждом узле алгебры и итоговое число строк.
+
+Использование:
+    python query_profile.py queries/7.py            # запустить скрипт и вывести EXPLAIN по каждому запросу
+    python query_profile.py queries/7.py --json p.json
+"""
+import argparse
+import contextlib
+import json
+import runpy
+import sys
+import time
+from rdflib import Graph, RDF
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql import evaluate as sparql_evaluate
+from rdflib.plugins.sparql.algebra import translateQuery
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.processor import SPARQLResult
+from rdflib.plugins.sparql.sparql import Query
+
+PROFILER_EVAL = "hsr_query_profiler"
+
+EVAL_NODES = {
+    "BGP", "Filter", "Join", "LeftJoin", "Graph", "Union", "ToMultiSet", "Extend", "Minus",
+    "Project", "Slice", "Distinct", "Reduced", "OrderBy", "Group", "AggregateJoin",
+    "SelectQuery", "AskQuery", "ConstructQuery", "DescribeQuery", "ServiceGraphPattern",
+}
+
+
+def _short(term):
+    if term == RDF.type:
+        return "a"
+    s = term.n3() if hasattr(term, "n3") else str(term)
+    if s.startswith("<") and "#" in s:
+        return ":" + s.split("#")[-1].rstrip(">")
+    return s
+
+
+class NodeStats:
+    __slots__ = ("name", "detail", "calls", "rows", "seconds", "children")
+
+    def __init__(self, name, detail=""):
+        self.name = name
+        self.detail = detail
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.children = []
+
+    def to_dict(self):
+        return {
+            "node": self.name,
+            "detail": self.detail,
+            "calls": self.calls,
+            "rows": self.rows,
+            "ms": round(self.seconds * 1000, 3),
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+def _build_tree(part, stats):
+    node = NodeStats(part.name, _describe(part))
+    stats[id(part)] = node
+    for key, value in part.items():
+        if key in ("expr", "triples"):
+            continue
+        for child in (value if isinstance(value, list) else [value]):
+            if isinstance(child, CompValue) and child.name in EVAL_NODES:
+                node.children.append(_build_tree(child, stats))
+    return node
+
+
+def _describe(part):
+    if part.name == "BGP":
+        return " . ".join(" ".join(_short(t) for t in triple) for triple in part.triples)
+    if part.name in ("Project",) and part.get("PV"):
+        return " ".join(_short(v) for v in part.PV)
+    if part.name == "Slice":
+        return f"offset={part.get('start')} limit={part.get('length')}"
+    return ""
+
+
+class QueryProfile:
+    def __init__(self, query_text: str):
+        self.query = query_text.strip()
+        self.phases = {}
+        self.rows = 0
+        self.root = None
+        self._stats = {}
+
+    @property
+    def total_seconds(self):
+        return sum(self.phases.values())
+
+    def to_dict(self):
+        return {
+            "query": self.query,
+            "phases_ms": {k: round(v * 1000, 3) for k, v in self.phases.items()},
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "rows": self.rows,
+            "plan": self.root.to_dict() if self.root else None,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kwargs)
+
+    def explain(self) -> str:
+        lines = [
+            "EXPLAIN ANALYZE",
+            "  " + "  ".join(f"{k}={v * 1000:.2f}ms" for k, v in self.phases.items())
+            + f"  total={self.total_seconds * 1000:.2f}ms  rows={self.rows}",
+        ]
+
+        def walk(node, depth):
+            pad = "  " * depth
+            line = f"{pad}-> {node.name}  rows={node.rows} calls={node.calls} time={node.seconds * 1000:.2f}ms"
+            lines.append(line)
+            if node.detail:
+                lines.append(f"{pad}     {node.detail}")
+            for child in node.children:
+                walk(child, depth + 1)
+
+        if self.root is not None:
+            walk(self.root, 1)
+        return "\n".join(lines)
+
+
+class _Profiler:
+    """Custom eval rdflib: оборачивает итератор решений каждого узла алгебры."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self._delegating = None
+
+    def __call__(self, ctx, part):
+        node = self.stats.get(id(part))
+        if node is None or self._delegating is part:
+            raise NotImplementedError()
+
+        self._delegating = part
+        try:
+            started = time.perf_counter()
+            res = sparql_evaluate.evalPart(ctx, part)
+            node.seconds += time.perf_counter() - started
+        finally:
+            self._delegating = None
+        node.calls += 1
+
+        if isinstance(res, dict):
+            # SelectQuery и др. возвращают словарь с генератором bindings
+            if "bindings" in res:
+                res["bindings"] = self._count(node, res["bindings"])
+            return res
+        return self._count(node, res)
+
+    @staticmethod
+    def _count(node, solutions):
+        it = iter(solutions)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                node.seconds += time.perf_counter() - started
+                return
+            node.seconds += time.perf_counter() - started
+            node.rows += 1
+            yield item
+
+
+def profile_query(graph: Graph, query, initBindings=None, initNs=None, base=None):
+    """
+    Выполняет запрос как graph.query(...) и возвращает (Result, QueryProfile).
+    Результат полностью материализован, так что фаза evaluate включает выборку всех строк.
+    """
+    text = query if isinstance(query, str) else str(getattr(query, "algebra", query))
+    profile = QueryProfile(text)
+    if initNs is None:
+        initNs = dict(graph.namespaces())
+
+    if isinstance(query, Query):
+        translated = query
+    else:
+        started = time.perf_counter()
+        parsed = parseQuery(query)
+        profile.phases["parse"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        translated = translateQuery(parsed, base, initNs)
+        profile.phases["translate"] = time.perf_counter() - started
+
+    profile.root = _build_tree(translated.algebra, profile._stats)
+
+    CUSTOM_EVALS[PROFILER_EVAL] = _Profiler(profile._stats)
+    try:
+        started = time.perf_counter()
+        result = SPARQLResult(sparql_evaluate.evalQuery(graph, translated, initBindings, base))
+        if result.type == "SELECT":
+            result.bindings = list(result.bindings)
+            profile.rows = len(result.bindings)
+        elif result.type == "ASK":
+            profile.rows = 1
+        else:
+            profile.rows = len(result.graph)
+        profile.phases["evaluate"] = time.perf_counter() - started
+    finally:
+        CUSTOM_EVALS.pop(PROFILER_EVAL, None)
+
+    return result, profile
+
+
+@contextlib.contextmanager
+def profiling(explain: bool = False, stream=None):
+    """
+    Подменяет Graph.query на профилирующую версию. Внутри блока все запросы
+    попадают в возвращаемый список профилей; при explain=True дерево печатается сразу.
+    """
+    profiles = []
+    original = Graph.query
+    stream = stream or sys.stderr
+
+    def query(self, query_object, processor="sparql", result="sparql", initNs=None, initBindings=None,
+              use_store_provided=True, **kwargs):
+        if processor != "sparql" or result != "sparql" or kwargs:
+            return original(self, query_object, processor, result, initNs, initBindings, use_store_provided, **kwargs)
+        res, profile = profile_query(self, query_object, initBindings=initBindings, initNs=initNs)
+        profiles.append(profile)
+        if explain:
+            print(profile.explain(), file=stream)
+            print(file=stream)
+        return res
+
+    Graph.query = query
+    try:
+        yield profiles
+    finally:
+        Graph.query = original
+
+
+def main():
+    ap = argparse.ArgumentParser(description="EXPLAIN-профиль SPARQL-запросов из скриптов queries/*.py")
+    ap.add_argument("script", help="Путь к скрипту с запросами, например queries/7.py")
+    ap.add_argument("--json", help="Куда сохранить профили в JSON")
+    ap.add_argument("--no-explain", action="store_true", help="Не печатать дерево плана")
+    args = ap.parse_args()
+
+    with profiling(explain=not args.no_explain) as profiles:
+        runpy.run_path(args.script, run_name="__main__")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([p.to_dict() for p in profiles], f, ensure_ascii=False, indent=2)
+        print(f"Профили сохранены в {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Быстрый путь для «звёздных» запросов вокруг одного субъекта (как в queries/1.py, 3.py, 5.py):
+
+    ?character a hsr:Character ; hsr:hasElement ?e ; hsr:hasPath <P> .
+    OPTIONAL { ?character hsr:recommendedLightCone ?lc }
+    OPTIONAL { ?character hsr:hasCavernRelic ?cavern }
+
+Обычный вычислитель rdflib проходит такие шаблоны вложенными циклами, а каждый OPTIONAL —
+отдельным LeftJoin по всем строкам левой части. Здесь звезда распознаётся в алгебре
+(BGP и цепочка LeftJoin с тем же субъектом) и вычисляется по субъектам: кандидаты берутся
+из самого избирательного шаблона, остальные свойства читаются поиском по (субъект, свойство).
+Строки результата те же (как мультимножество), что и у rdflib; всё, что не похоже на звезду,
+уходит обычному вычислителю.
+
+Подключается через CUSTOM_EVALS rdflib:
+
+    from star_eval import star_fast_path
+    with star_fast_path():
+        g.query(q)
+
+Проверка на скриптах из queries/ (результаты сравниваются с обычным вычислителем):
+    python star_eval.py queries/5.py --check
+"""
+import argparse
+import contextlib
+import itertools
+import runpy
+import sys
+import time
+from collections import Counter
+from rdflib import BNode, Graph, RDF, URIRef, Variable
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql import evaluate as sparql_evaluate
+
+STAR_EVAL = "hsr_star"
+
+
+class StarPlan:
+    """Звезда вокруг переменной subject: обязательные шаблоны, группы OPTIONAL и прочие шаблоны BGP."""
+
+    def __init__(self, subject, required, rest):
+        self.subject = subject
+        self.required = required    # [(свойство, объект)]
+        self.optional = []          # [[(свойство, объект)]] — по группе на OPTIONAL
+        self.rest = rest            # шаблоны BGP без субъекта звезды, вычисляются rdflib
+
+    def variables(self):
+        found = {self.subject}
+        for p, o in self.required:
+            found.add(o)
+        for group in self.optional:
+            for p, o in group:
+                found.add(o)
+        for triple in self.rest:
+            found.update(triple)
+        return {v for v in found if isinstance(v, Variable)}
+
+
+def _star_patterns(triples, subject):
+    """Шаблоны (свойство, объект) с субъектом subject или None, если это не простая звезда."""
+    patterns = []
+    seen = set()
+    for s, p, o in triples:
+        if s != subject or not isinstance(p, URIRef) or isinstance(o, BNode) or o == subject:
+            return None
+        if isinstance(o, Variable):
+            if o in seen:
+                return None
+            seen.add(o)
+        patterns.append((p, o))
+    return patterns
+
+
+def plan_bgp(triples):
+    """StarPlan для BGP: звезда — самая большая группа шаблонов с общим субъектом-переменной."""
+    counts = Counter(s for s, _, _ in triples if isinstance(s, Variable))
+    if not counts:
+        return None
+    subject, size = counts.most_common(1)[0]
+    if size < 2:
+        return None
+
+    star = [t for t in triples if t[0] == subject]
+    rest = [t for t in triples if t[0] != subject]
+    if any(subject in t or any(isinstance(n, BNode) for n in t) for t in rest):
+        return None
+    patterns = _star_patterns(star, subject)
+    if patterns is None:
+        return None
+    # объекты звезды, общие с остальными шаблонами, подставляются как константы:
+    # остальные шаблоны вычисляются первыми
+    return StarPlan(subject, patterns, rest)
+
+
+def plan_part(part):
+    """StarPlan для узла алгебры (BGP или цепочка LeftJoin над звездой) или None."""
+    if part.name == "BGP":
+        return plan_bgp(part.triples)
+    if part.name != "LeftJoin" or part.p2.name != "BGP":
+        return None
+    if part.expr is not None and getattr(part.expr, "name", None) != "TrueFilter":
+        return None
+
+    plan = plan_part(part.p1)
+    if plan is None:
+        return None
+    group = _star_patterns(part.p2.triples, plan.subject)
+    if not group:
+        return None
+    bound = plan.variables()
+    if any(isinstance(o, Variable) and o in bound for _, o in group):
+        # переменная уже связана слева — нужна проверка совместимости, оставляем rdflib
+        return None
+    plan.optional.append(group)
+    return plan
+
+
+def _resolve(binding, term):
+    if isinstance(term, Variable):
+        return binding.get(term)
+    return term
+
+
+def _candidates(graph, binding, plan):
+    subject = binding.get(plan.subject)
+    if subject is not None:
+        return [subject]
+
+    constant = [(p, _resolve(binding, o)) for p, o in plan.required]
+    constant = [(p, o) for p, o in constant if o is not None]
+    if constant:
+        # rdf:type обычно наименее избирателен, поэтому берётся последним
+        p, o = min(constant, key=lambda po: po[0] == RDF.type)
+        return list(graph.subjects(p, o))
+    p = plan.required[0][0]
+    return list(dict.fromkeys(s for s, _, _ in graph.triples((None, p, None))))
+
+
+def _match(graph, subject, patterns, binding):
+    """Значения переменных шаблонов для субъекта: список словарей (декартово произведение) или []."""
+    columns = []
+    for p, o in patterns:
+        value = _resolve(binding, o)
+        if value is not None:
+            if (subject, p, value) not in graph:
+                return []
+            continue
+        values = list(graph.objects(subject, p))
+        if not values:
+            return []
+        columns.append([(o, v) for v in values])
+    return [dict(combo) for combo in itertools.product(*columns)]
+
+
+def evaluate_plan(ctx, plan):
+    graph = ctx.graph
+    if plan.rest:
+        bases = sparql_evaluate.evalBGP(ctx, plan.rest)
+    else:
+        bases = [ctx.solution()]
+
+    for base in bases:
+        for subject in _candidates(graph, base, plan):
+            for row in _match(graph, subject, plan.required, base):
+                rows = [row]
+                for group in plan.optional:
+                    matches = _match(graph, subject, group, base)
+                    if matches:
+                        rows = [{**left, **m} for left in rows for m in matches]
+                for r in rows:
+                    r[plan.subject] = subject
+                    yield base.merge(r)
+
+
+def star_eval(ctx, part):
+    if part.name not in ("BGP", "LeftJoin"):
+        raise NotImplementedError()
+    plan = plan_part(part)
+    if plan is None:
+        raise NotImplementedError()
+    return evaluate_plan(ctx, plan)
+
+
+def enable():
+    CUSTOM_EVALS[STAR_EVAL] = star_eval
+
+
+def disable():
+    CUSTOM_EVALS.pop(STAR_EVAL, None)
+
+
+@contextlib.contextmanager
+def star_fast_path():
+    was_enabled = STAR_EVAL in CUSTOM_EVALS
+    enable()
+    try:
+        yield
+    finally:
+        if not was_enabled:
+            disable()
+
+
+def _rows(result):
+    return Counter(tuple(row) for row in result)
+
+
+@contextlib.contextmanager
+def checking(stream=None):
+    """
+    Подменяет Graph.query: каждый запрос выполняется обычным вычислителем и быстрым путём,
+    строки сравниваются, время печатается. Возвращается результат быстрого пути.
+    """
+    original = Graph.query
+    stream = stream or sys.stderr
+    mismatches = []
+
+    def query(self, *args, **kwargs):
+        disable()
+        started = time.perf_counter()
+        expected = original(self, *args, **kwargs)
+        expected_rows = _rows(expected)
+        slow = time.perf_counter() - started
+
+        enable()
+        try:
+            started = time.perf_counter()
+            result = original(self, *args, **kwargs)
+            rows = _rows(result)
+            fast = time.perf_counter() - started
+        finally:
+            disable()
+
+        same = rows == expected_rows
+        if not same:
+            mismatches.append(args[0] if args else kwargs.get("query_object"))
+        print(f"rdflib {slow * 1000:.2f}ms, star {fast * 1000:.2f}ms, rows={sum(rows.values())} "
+              f"{'OK' if same else 'MISMATCH'}", file=stream)
+        return result
+
+    Graph.query = query
+    try:
+        yield mismatches
+    finally:
+        Graph.query = original
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Запуск скриптов queries/*.py с быстрым путём для звёздных запросов")
+    ap.add_argument("script", help="Путь к скрипту с запросами, например queries/5.py")
+    ap.add_argument("--check", action="store_true", help="Сравнить строки и время с обычным вычислителем rdflib")
+    args = ap.parse_args()
+
+    if args.check:
+        with checking() as mismatches:
+            runpy.run_path(args.script, run_name="__main__")
+        if mismatches:
+            sys.exit(1)
+    else:
+        with star_fast_path():
+            runpy.run_path(args.script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Генератор синтетических HSR-графов для нагрузочного тестирования.
+
+Классы и свойства берутся из ontology/build.py, размеры задаются множителем
+относительно реальной онтологии (scale=10 ... 1000). Популярность конусов, реликвий
+и персонажей в командах распределена по Ципфу, как на реальных данных: немногие
+сущности встречаются очень часто, большинство — редко.
+
+Использование:
+    python synthetic_graph.py --scale 10 --out data/synthetic_x10.rdf
+    python synthetic_graph.py --scale 1000 --out data/synthetic_x1000.nt --seed 7
+"""
+import argparse
+import bisect
+import itertools
+import random
+from rdflib import Graph, Literal, Namespace, RDF, RDFS
+from rdflib.util import guess_format
+from ontology.build import CHARACTERISTICS, ELEMENTS, PATHS, normalize, ontology_graph
+
+HSR = Namespace("http://example.org/hsr-ontology#")
+
+# размеры реальной онтологии, scale=1
+BASE_SIZES = {
+    "characters": 80,
+    "light_cones": 175,
+    "cavern_relics": 40,
+    "planar_relics": 30,
+    "enemies": 135,
+    "teams": 60,
+}
+
+# локальные имена, на которые ссылаются скрипты queries/*.py, чтобы их можно было гонять на синтетике
+ANCHOR_CHARACTERS = ["Archer"]
+ANCHOR_ENEMIES = ["Phantylia_the_Undying", "Doomsday_Beast", "Stormbringer", "Cocolia,_Mother_of_Deception"]
+
+ZIPF_EXPONENT = 1.1
+SOURCE_BASE = "https://example.org/hsr/archives/"
+MAIN_STAT_PROPERTIES = (
+    HSR.recommendedMainStatBody,
+    HSR.recommendedMainStatFeet,
+    HSR.recommendedMainStatSphere,
+    HSR.recommendedMainStatRope,
+)
+
+
+def scaled_sizes(scale: float) -> dict:
+    return {k: max(1, int(round(v * scale))) for k, v in BASE_SIZES.items()}
+
+
+class ZipfSampler:
+    """Выбор элементов с вероятностью ~ 1 / rank^s; ранги перемешаны, чтобы популярность не зависела от номера."""
+
+    def __init__(self, items, rng: random.Random, exponent: float = ZIPF_EXPONENT):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        weights = [1.0 / (rank ** exponent) for rank in range(1, len(self.items) + 1)]
+        self.cum = list(itertools.accumulate(weights))
+        self.rng = rng
+
+    def one(self):
+        x = self.rng.random() * self.cum[-1]
+        return self.items[bisect.bisect_left(self.cum, x)]
+
+    def distinct(self, k: int):
+        k = min(k, len(self.items))
+        picked = []
+        seen = set()
+        while len(picked) < k:
+            item = self.one()
+            if item not in seen:
+                seen.add(item)
+                picked.append(item)
+        return picked
+
+
+def _entities(prefix: str, count: int, anchors=()):
+    width = len(str(count))
+    named = [(HSR[name], name.replace("_", " ")) for name in anchors[:count]]
+    return named + [(HSR[f"{prefix}_{i:0{width}d}"], f"{prefix.replace('_', ' ')} {i:0{width}d}")
+                    for i in range(len(named) + 1, count + 1)]
+
+
+def _type_closure():
+    """{класс: [класс и его надклассы по rdfs:subClassOf схемы]}."""
+    schema = ontology_graph()
+    return {cls: list(schema.transitive_objects(cls, RDFS.subClassOf))
+            for cls in set(schema.subjects(RDFS.subClassOf, None))}
+
+
+def iter_triples(scale: float = 10, seed: int = 42):
+    """
+    Генерирует триплеты данных (без схемы) для графа заданного масштаба. Типы сущностей
+    пишутся вместе с надклассами, как после материализации RDFS (relics — и hsr:Set).
+    """
+    rng = random.Random(seed)
+    closure = _type_closure()
+
+    def typed(uri, cls):
+        for c in closure.get(cls, (cls,)):
+            yield uri, RDF.type, c
+
+    sizes = scaled_sizes(scale)
+    paths = [HSR[normalize(p)] for p in PATHS]
+    elements = [HSR[normalize(e)] for e in ELEMENTS]
+    stats = [HSR[normalize(c)] for c in CHARACTERISTICS]
+
+    source_ids = itertools.count(400000)
+
+    def source():
+        return Literal(f"{SOURCE_BASE}{next(source_ids)}")
+
+    light_cones = _entities("LightCone", sizes["light_cones"])
+    for uri, label in light_cones:
+        yield from typed(uri, HSR.LightCone)
+        yield uri, RDFS.label, Literal(label)
+        yield uri, HSR.lightConeHasPath, rng.choice(paths)
+        yield uri, HSR.sourceURL, source()
+
+    relic_sets = {}
+    for key, prefix, cls in (("cavern_relics", "Cavern_Set", HSR.CavernRelics),
+                             ("planar_relics", "Planar_Set", HSR.PlanarRelics)):
+        relic_sets[cls] = _entities(prefix, sizes[key])
+        for uri, label in relic_sets[cls]:
+            yield from typed(uri, cls)
+            yield uri, RDFS.label, Literal(label)
+            yield uri, RDFS.comment, Literal(
+                f"2-Piece: {rng.choice(CHARACTERISTICS)} increases by {rng.randint(8, 20)}%. "
+                f"4-Piece: {rng.choice(ELEMENTS)} DMG increases by {rng.randint(10, 30)}%."
+            )
+            yield uri, HSR.sourceURL, source()
+
+    cone_sampler = ZipfSampler([u for u, _ in light_cones], rng)
+    cavern_sampler = ZipfSampler([u for u, _ in relic_sets[HSR.CavernRelics]], rng)
+    planar_sampler = ZipfSampler([u for u, _ in relic_sets[HSR.PlanarRelics]], rng)
+
+    characters = _entities("Character", sizes["characters"], ANCHOR_CHARACTERS)
+    for uri, label in characters:
+        yield from typed(uri, HSR.Character)
+        yield uri, RDFS.label, Literal(label)
+        yield uri, HSR.hasElement, rng.choice(elements)
+        yield uri, HSR.hasPath, rng.choice(paths)
+        yield uri, HSR.sourceURL, source()
+
+        recommended, *alternatives = cone_sampler.distinct(1 + rng.choice((3, 4, 5, 5, 5, 6)))
+        yield uri, HSR.recommendedLightCone, recommended
+        for cone in alternatives:
+            yield uri, HSR.hasAlternativeLightCones, cone
+
+        for prop in MAIN_STAT_PROPERTIES:
+            yield uri, prop, rng.choice(stats)
+        for stat in rng.sample(stats, rng.randint(3, 5)):
+            yield uri, HSR.recommendedSubStats, stat
+
+        for relic in cavern_sampler.distinct(2 if rng.random() < 0.1 else 1):
+            yield uri, HSR.hasCavernRelic, relic
+        for relic in planar_sampler.distinct(2 if rng.random() < 0.1 else 1):
+            yield uri, HSR.hasPlanarRelic, relic
+
+    for uri, label in _entities("Enemy", sizes["enemies"], ANCHOR_ENEMIES):
+        yield from typed(uri, HSR.Enemies)
+        yield uri, RDFS.label, Literal(label)
+        yield uri, HSR.sourceURL, source()
+        for element in rng.sample(elements, rng.choices((1, 2, 3), weights=(35, 45, 20))[0]):
+            yield uri, HSR.hasWeakness, element
+
+    member_sampler = ZipfSampler([u for u, _ in characters], rng)
+    for uri, label in _entities("Team", sizes["teams"]):
+        yield from typed(uri, HSR.Team)
+        yield uri, RDFS.label, Literal(label)
+        yield uri, HSR.sourceURL, source()
+        members = member_sampler.distinct(4)
+        roles = [HSR.hasDPS, HSR.hasSupport, HSR.hasSupport, HSR.hasSustain]
+        for prop, member in zip(roles, members):
+            yield uri, prop, member
+
+
+def generate_graph(scale: float = 10, seed: int = 42, with_schema: bool = True) -> Graph:
+    g = ontology_graph() if with_schema else Graph()
+    g.bind("hsr", HSR)
+    for triple in iter_triples(scale, seed):
+        g.add(triple)
+    return g
+
+
+def write_graph(path: str, scale: float = 10, seed: int = 42, format: str | None = None) -> int:
+    """
+    Пишет синтетический граф в файл. N-Triples пишутся потоково, без построения графа в памяти,
+    остальные форматы сериализуются через rdflib. Возвращает число триплетов.
+    """
+    format = format or guess_format(path) or "xml"
+    if format in ("nt", "nt11", "ntriples"):
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for triple in itertools.chain(ontology_graph(), iter_triples(scale, seed)):
+                f.write(" ".join(term.n3() for term in triple) + " .\n")
+                count += 1
+        return count
+
+    g = generate_graph(scale, seed)
+    g.serialize(destination=path, format=format)
+    return len(g)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Синтетический граф HSR для нагрузочного тестирования")
+    ap.add_argument("--scale", type=float, default=10, help="Множитель размера относительно реальной онтологии")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="Путь к файлу; формат определяется по расширению")
+    ap.add_argument("--format", default=None, help="xml, turtle, nt, n3, json-ld ...")
+    args = ap.parse_args()
+
+    out = args.out or f"data/synthetic_x{args.scale:g}.rdf"
+    count = write_graph(out, args.scale, args.seed, args.format)
+    print(f"Синтетический граф x{args.scale:g}: {count} триплетов -> {out}")
+
+
+if __name__ == "__main__":
+    main()
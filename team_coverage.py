@@ -0,0 +1,144 @@
+"""
+Предвычисленная матрица покрытия слабостей боссов командами.
+
+team_members (команды × персонажи) · char_elements (персонажи × элементы) даёт число участников
+команды каждого элемента; умножение на boss_weakness.T (элементы × боссы) — сколько участников
+команды бьют в слабость каждого босса. Это тот же счёт, что в queries/7.py, но для всех пар
+команда/босс одним разреженным произведением.
+
+Использование:
+    python team_coverage.py --boss Phantylia_the_Undying
+    python team_coverage.py --boss Stormbringer --top 10
+"""
+import argparse
+import numpy as np
+from rdflib import Graph, Namespace, RDF, RDFS
+from scipy import sparse
+
+HSR = Namespace("http://example.org/hsr-ontology#")
+ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+
+ROLE_PROPERTIES = (HSR.hasDPS, HSR.hasSupport, HSR.hasSustain, HSR.hasMember)
+
+
+def local_name(node):
+    s = str(node)
+    return s.split("#")[-1] if "#" in s else s.rstrip("/").split("/")[-1]
+
+
+def _index(items):
+    ordered = sorted(set(items), key=str)
+    return ordered, {item: i for i, item in enumerate(ordered)}
+
+
+def _incidence(pairs, row_index, col_index):
+    rows = [row_index[r] for r, c in pairs]
+    cols = [col_index[c] for r, c in pairs]
+    data = np.ones(len(rows), dtype=np.int32)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(row_index), len(col_index)), dtype=np.int32)
+
+
+class CoverageMatrix:
+    def __init__(self, teams, bosses, coverage, team_elements):
+        self.teams = teams
+        self.bosses = bosses
+        self.team_index = {t: i for i, t in enumerate(teams)}
+        self.boss_index = {b: i for i, b in enumerate(bosses)}
+        self.coverage = coverage.tocsc()        # команды × боссы
+        self.team_elements = team_elements     # команды × элементы
+
+    @classmethod
+    def from_graph(cls, graph: Graph):
+        teams = set(graph.subjects(RDF.type, HSR.Team))
+        # тройка (команда, участник, роль), как строки UNION + DISTINCT в queries/7.py:
+        # участник в двух разных ролях считается дважды
+        membership = list(dict.fromkeys(
+            (t, m, p) for p in ROLE_PROPERTIES for t, m in graph.subject_objects(p) if t in teams
+        ))
+        char_elements = list(set(graph.subject_objects(HSR.hasElement)))
+        weaknesses = list(set(graph.subject_objects(HSR.hasWeakness)))
+
+        team_list, team_idx = _index(teams)
+        _, char_idx = _index([m for _, m, _ in membership] + [c for c, _ in char_elements])
+        _, elem_idx = _index([e for _, e in char_elements] + [e for _, e in weaknesses])
+        bosses, boss_idx = _index(b for b, _ in weaknesses)
+
+        # повторы (команда, участник) из разных ролей суммируются при сборке csr
+        team_members = _incidence([(t, m) for t, m, _ in membership], team_idx, char_idx)
+        member_elements = _incidence(char_elements, char_idx, elem_idx)
+        boss_weakness = _incidence(weaknesses, boss_idx, elem_idx)
+
+        team_elements = team_members @ member_elements
+        coverage = team_elements @ boss_weakness.T
+        return cls(team_list, bosses, coverage, team_elements.tocsr())
+
+    def counts(self, boss):
+        """Число совпавших участников для каждой команды против босса (плотный вектор)."""
+        col = self.boss_index.get(boss)
+        if col is None:
+            return np.zeros(len(self.teams), dtype=np.int32)
+        return self.coverage[:, col].toarray().ravel()
+
+    def teams_with_coverage(self, boss, allowed=(3, 4)):
+        """Команды, у которых число совпадений входит в allowed; по убыванию совпадений, затем по имени."""
+        counts = self.counts(boss)
+        mask = np.isin(counts, allowed)
+        found = [(self.teams[i], int(counts[i])) for i in np.flatnonzero(mask)]
+        found.sort(key=lambda x: (-x[1], local_name(x[0])))
+        return found
+
+    def top_k(self, boss, k: int = 5):
+        col = self.boss_index.get(boss)
+        if col is None:
+            return []
+        return self._top_k_column(col, k)
+
+    def top_k_all(self, k: int = 5):
+        """Топ-k команд для каждого босса: {boss: [(team, count), ...]}."""
+        return {boss: self._top_k_column(col, k) for col, boss in enumerate(self.bosses)}
+
+    def _top_k_column(self, col, k):
+        start, end = self.coverage.indptr[col], self.coverage.indptr[col + 1]
+        rows = self.coverage.indices[start:end]
+        data = self.coverage.data[start:end]
+        if len(data) == 0:
+            return []
+        if len(data) > k:
+            # все строки не хуже k-й: среди равных на границе выбирают имена, а не argpartition
+            keep = data >= np.partition(data, -k)[-k]
+            rows, data = rows[keep], data[keep]
+        names = np.array([local_name(self.teams[r]) for r in rows])
+        order = np.lexsort((names, -data))[:k]
+        return [(self.teams[rows[i]], int(data[i])) for i in order]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Команды, покрывающие слабости босса, по предвычисленной матрице")
+    ap.add_argument("--boss", default="Phantylia_the_Undying", help="Локальное имя босса")
+    ap.add_argument("--top", type=int, default=0, help="Вывести топ-k команд вместо фильтра 3–4 совпадений")
+    ap.add_argument("ontology", nargs="?", default=ONTOLOGY_PATH)
+    args = ap.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology)
+    matrix = CoverageMatrix.from_graph(g)
+
+    boss_uri = HSR[args.boss]
+    weaknesses = [local_name(w) for w in g.objects(boss_uri, HSR.hasWeakness)]
+    if not weaknesses:
+        print(f"Warning: boss {args.boss} has no recorded hsr:hasWeakness in the ontology.")
+    else:
+        print("Boss weaknesses:", ", ".join(weaknesses))
+    print()
+
+    found = matrix.top_k(boss_uri, args.top) if args.top else matrix.teams_with_coverage(boss_uri)
+    if not found:
+        print("No teams found that cover the boss weaknesses.")
+        return
+    for team, count in found:
+        label = g.value(team, RDFS.label)
+        print(f"{label or local_name(team)} — matches: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Граф совместной игры персонажей по командам (hsr:Team), с разбивкой по ролям.
+
+Для каждой роли r хранится разреженная матрица M_r (персонажи × персонажи):
+M_r[i, j] — в скольких командах персонаж i играет вместе с j, где j занимает роль r.
+Сумма по ролям даёт общую матрицу совместной игры. При изменении команд матрицы
+обновляются на разницу между старым и новым составом, без полного пересчёта.
+
+Использование:
+    python team_synergy.py Archer
+    python team_synergy.py Archer --role Support --top 10
+"""
+import argparse
+from collections import defaultdict
+import numpy as np
+from rdflib import Graph, Namespace, RDF, RDFS
+from scipy import sparse
+
+HSR = Namespace("http://example.org/hsr-ontology#")
+ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+
+ROLES = {
+    "DPS": HSR.hasDPS,
+    "Support": HSR.hasSupport,
+    "Sustain": HSR.hasSustain,
+    "Member": HSR.hasMember,
+}
+
+
+def local_name(node):
+    s = str(node)
+    return s.split("#")[-1] if "#" in s else s.rstrip("/").split("/")[-1]
+
+
+def read_team(graph: Graph, team):
+    """Состав команды из графа: {роль: frozenset(персонажей)}."""
+    return {role: frozenset(graph.objects(team, prop)) for role, prop in ROLES.items()}
+
+
+class SynergyGraph:
+    def __init__(self):
+        self.characters = []
+        self.char_index = {}
+        self._teams = {}                          # команда -> {роль: frozenset}
+        self._matrices = {role: sparse.csr_matrix((0, 0), dtype=np.int32) for role in ROLES}
+        self._pending = defaultdict(int)          # (роль, i, j) -> изменение веса
+
+    @classmethod
+    def from_graph(cls, graph: Graph):
+        synergy = cls()
+        teams = sorted(set(graph.subjects(RDF.type, HSR.Team)), key=str)
+        for team in teams:
+            synergy._teams[team] = read_team(graph, team)
+            for members in synergy._teams[team].values():
+                for char in members:
+                    synergy._char_id(char)
+
+        n_teams, n_chars = len(teams), len(synergy.characters)
+        if not n_teams:
+            synergy._resize()
+            return synergy
+
+        incidence = {}
+        for role in ROLES:
+            rows, cols = [], []
+            for t, team in enumerate(teams):
+                for char in synergy._teams[team][role]:
+                    rows.append(t)
+                    cols.append(synergy.char_index[char])
+            incidence[role] = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(n_teams, n_chars), dtype=np.int32
+            )
+
+        in_team = sum(incidence.values())
+        in_team.data[:] = 1
+        for role in ROLES:
+            m = (in_team.T @ incidence[role]).tocsr()
+            m.setdiag(0)
+            m.eliminate_zeros()
+            synergy._matrices[role] = m
+        return synergy
+
+    def _char_id(self, char):
+        idx = self.char_index.get(char)
+        if idx is None:
+            idx = len(self.characters)
+            self.char_index[char] = idx
+            self.characters.append(char)
+        return idx
+
+    def _resize(self):
+        n = len(self.characters)
+        for role, m in self._matrices.items():
+            if m.shape != (n, n):
+                m = m.tolil()
+                m.resize((n, n))
+                self._matrices[role] = m.tocsr()
+
+    def _contribute(self, roles, sign):
+        members = set().union(*roles.values()) if roles else set()
+        for role, role_members in roles.items():
+            for j_char in role_members:
+                j = self._char_id(j_char)
+                for i_char in members:
+                    if i_char != j_char:
+                        self._pending[(role, self._char_id(i_char), j)] += sign
+
+    def set_team(self, team, roles):
+        """Добавляет или заменяет состав команды; матрицы меняются только на разницу."""
+        roles = {role: frozenset(roles.get(role, ())) for role in ROLES}
+        old = self._teams.get(team)
+        if old == roles:
+            return
+        if old is not None:
+            self._contribute(old, -1)
+        self._contribute(roles, +1)
+        self._teams[team] = roles
+
+    def remove_team(self, team):
+        old = self._teams.pop(team, None)
+        if old is not None:
+            self._contribute(old, -1)
+
+    def refresh(self, graph: Graph, teams=None):
+        """
+        Перечитывает команды из графа. teams — изменённые команды; если не указаны,
+        сравниваются все: новые добавляются, исчезнувшие удаляются.
+        """
+        current = set(graph.subjects(RDF.type, HSR.Team))
+        if teams is None:
+            for team in set(self._teams) - current:
+                self.remove_team(team)
+            teams = current
+        for team in teams:
+            if team in current:
+                self.set_team(team, read_team(graph, team))
+            else:
+                self.remove_team(team)
+
+    def _flush(self):
+        self._resize()
+        if not self._pending:
+            return
+        n = len(self.characters)
+        by_role = defaultdict(lambda: ([], [], []))
+        for (role, i, j), delta in self._pending.items():
+            if delta:
+                rows, cols, data = by_role[role]
+                rows.append(i)
+                cols.append(j)
+                data.append(delta)
+        self._pending.clear()
+        for role, (rows, cols, data) in by_role.items():
+            delta = sparse.csr_matrix((np.array(data, dtype=np.int32), (rows, cols)), shape=(n, n))
+            m = self._matrices[role] + delta
+            m.eliminate_zeros()
+            self._matrices[role] = m.tocsr()
+
+    def matrix(self, role=None):
+        """Матрица совместной игры для роли или суммарная (role=None)."""
+        self._flush()
+        if role is not None:
+            return self._matrices[role]
+        return sum(self._matrices.values()).tocsr()
+
+    def top_partners(self, char, k: int = 5, role=None):
+        """Топ-k напарников персонажа (при role — только в этой роли): [(персонаж, число команд)]."""
+        idx = self.char_index.get(char)
+        if idx is None:
+            return []
+        m = self.matrix(role)
+        start, end = m.indptr[idx], m.indptr[idx + 1]
+        cols, data = m.indices[start:end], m.data[start:end]
+        if len(data) > k:
+            # все столбцы не хуже k-го: среди равных на границе выбирают имена, а не argpartition
+            keep = data >= np.partition(data, -k)[-k]
+            cols, data = cols[keep], data[keep]
+        names = np.array([local_name(self.characters[c]) for c in cols])
+        order = np.lexsort((names, -data))[:k]
+        return [(self.characters[cols[i]], int(data[i])) for i in order]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Лучшие напарники персонажа по составам команд")
+    ap.add_argument("character", help="Локальное имя персонажа, например Archer")
+    ap.add_argument("--role", choices=list(ROLES), help="Учитывать напарников только в этой роли")
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--ontology", default=ONTOLOGY_PATH)
+    args = ap.parse_args()
+
+    g = Graph()
+    g.parse(args.ontology)
+    synergy = SynergyGraph.from_graph(g)
+
+    partners = synergy.top_partners(HSR[args.character], args.top, args.role)
+    if not partners:
+        print(f"No teams found containing character {args.character}.")
+        return
+    for char, count in partners:
+        label = g.value(char, RDFS.label)
+        print(f"{label or local_name(char)} — teams together: {count}")
+
+
+if __name__ == "__main__":
+    main()
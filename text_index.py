@@ -0,0 +1,207 @@
+"""
+Полнотекстовый индекс по rdfs:label и rdfs:comment (описания эффектов сетов) с ранжированием BM25.
+
+Индекс строится при загрузке и сохраняется рядом с онтологией
+(data/hsr_ontology.rdf -> data/hsr_ontology.textindex.json); если файл онтологии
+не менялся, индекс читается с диска.
+
+Использование:
+    python text_index.py "crit damage"
+    python text_index.py "break effect" --top 10
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from rdflib import Graph, RDFS
+
+from utils import file_sha1
+
+ONTOLOGY_PATH = "data/hsr_ontology.rdf"
+INDEX_VERSION = 2
+
+K1 = 1.5
+B = 0.75
+FIELD_WEIGHTS = {RDFS.label: 2, RDFS.comment: 1}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "if", "in", "is", "it",
+    "its", "of", "on", "or", "the", "their", "them", "this", "to", "when", "will", "with", "wearer",
+}
+
+# сокращения, которые в описаниях встречаются наравне с полными словами
+ALIASES = {
+    "damage": "dmg",
+    "critical": "crit",
+    "attack": "atk",
+    "defense": "def",
+    "defence": "def",
+    "speed": "spd",
+    "resistance": "res",
+    "pc": "piece",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+
+
+def stem(word: str) -> str:
+    """Упрощённый английский стеммер: снимает окончания множественного числа, -ing, -ed, -ly и конечное e."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith("ss") and not word.endswith("us"):
+        word = word[:-1]
+
+    for suffix in ("ing", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and re.search(r"[aeiouy]", word[:-len(suffix)]):
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+# сокращения сопоставляются после стемминга: "attacks" и "attack" дают одну основу
+_STEMMED_ALIASES = {stem(word): stem(alias) for word, alias in ALIASES.items()}
+
+
+def tokenize(text: str):
+    tokens = []
+    for raw in _TOKEN_RE.findall(_POSSESSIVE_RE.sub("", text.lower())):
+        if raw in STOPWORDS:
+            continue
+        term = stem(raw)
+        tokens.append(_STEMMED_ALIASES.get(term, term))
+    return tokens
+
+
+def index_path_for(ontology_path: str) -> str:
+    return os.path.splitext(ontology_path)[0] + ".textindex.json"
+
+
+class TextIndex:
+    def __init__(self):
+        self.docs = []              # id -> IRI (строкой)
+        self.doc_len = []           # id -> взвешенная длина
+        self.postings = {}          # термин -> {id: взвешенная частота}
+        self.source = None
+
+    @classmethod
+    def from_graph(cls, graph: Graph, fields=None):
+        fields = fields or FIELD_WEIGHTS
+        weighted = defaultdict(Counter)
+        for prop, weight in fields.items():
+            for s, text in graph.subject_objects(prop):
+                for token in tokenize(str(text)):
+                    weighted[str(s)][token] += weight
+
+        index = cls()
+        postings = defaultdict(dict)
+        for doc_id, (uri, counts) in enumerate(sorted(weighted.items())):
+            index.docs.append(uri)
+            index.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term][doc_id] = tf
+        index.postings = dict(postings)
+        return index
+
+    def __len__(self):
+        return len(self.docs)
+
+    def search(self, query: str, k: int = 10):
+        """BM25 по всем терминам запроса: [(IRI, score)] по убыванию."""
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_len = sum(self.doc_len) / n
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = K1 * (1 - B + B * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda x: (x[1], -x[0]))
+        return [(self.docs[doc_id], score) for doc_id, score in best]
+
+    def save(self, path: str):
+        data = {
+            "version": INDEX_VERSION,
+            "source": self.source,
+            "docs": self.docs,
+            "doc_len": self.doc_len,
+            "postings": {t: [[d, tf] for d, tf in p.items()] for t, p in self.postings.items()},
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Неподдерживаемая версия индекса: {data.get('version')}")
+        index = cls()
+        index.source = data.get("source")
+        index.docs = data["docs"]
+        index.doc_len = data["doc_len"]
+        index.postings = {t: {d: tf for d, tf in p} for t, p in data["postings"].items()}
+        return index
+
+
+def load_text_index(ontology_path: str = ONTOLOGY_PATH, graph: Graph | None = None, index_path: str | None = None):
+    """
+    Индекс для онтологии: читается с диска, если он построен по той же версии файла,
+    иначе строится заново (из graph или из файла) и сохраняется рядом с онтологией.
+    """
+    index_path = index_path or index_path_for(ontology_path)
+    fingerprint = file_sha1(ontology_path)
+    if os.path.exists(index_path):
+        try:
+            index = TextIndex.load(index_path)
+            if index.source == fingerprint:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if graph is None:
+        graph = Graph()
+        graph.parse(ontology_path)
+    index = TextIndex.from_graph(graph)
+    index.source = fingerprint
+    index.save(index_path)
+    return index
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Поиск по названиям и описаниям эффектов (BM25)")
+    ap.add_argument("query", help="Ключевые слова, например 'crit damage'")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--ontology", default=ONTOLOGY_PATH)
+    args = ap.parse_args()
+
+    index = load_text_index(args.ontology)
+    hits = index.search(args.query, args.top)
+    if not hits:
+        print("Ничего не найдено.")
+        return
+    for uri, score in hits:
+        print(f"{score:7.3f}  {uri.split('#')[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,202 @@
+"""
+Обучение эмбеддингов онтологии (pykeen) и примеры запросов к ним.
+
+torch, pykeen, matplotlib и scikit-learn импортируются внутри функций, которым они нужны:
+просмотр метрик и поиск похожих сущностей по сохранённому артефакту (embedding_store.py)
+работают только на NumPy и не платят секунды за импорт torch.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
 import os
 import pickle
+import shutil
+from typing import TYPE_CHECKING
 
 import numpy as np
-import rdflib
-import torch
-from pykeen.models import TransE
-from pykeen.pipeline import pipeline
-from pykeen.triples import TriplesFactory
 import json
 
-try:
-    import torch_directml
-except ImportError:
-    torch_directml = None
+from embedding_index import SimilarityIndex
+from embedding_store import EmbeddingStore, write_store
+from utils import file_sha1
+
+if TYPE_CHECKING:
+    from embedding_triples import TripleSelection
+    from pykeen.models import Model
+    from pykeen.triples import TriplesFactory
+
+MODEL_FILE = "trained_model.pkl"
+SERVING_SUBDIR = "serving"
+SOURCE_FILE = "source.json"
+INCREMENTAL_EPOCHS = 20
+OLD_TRIPLES_RATIO = 1.0
+NUM_EPOCHS = 400
+EVAL_FREQUENCY = 10         # эпох между оценками на валидации
+PATIENCE = 3                # оценок без улучшения MRR до остановки
+CHECKPOINT_MINUTES = 5
+CHECKPOINT_SUBDIR = "checkpoints"
+FAILURE_CHECKPOINT_GLOB = "PyKEEN_just_saved_my_day_*.pt"   # имя, под которым pykeen сохраняет точку при сбое
+TRAINING_LOG = "training_log.jsonl"
+
+
+def _pyplot():
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+    return plt
 
-try:
-    import matplotlib.pyplot as plt
-except ImportError:
-    plt = None
 
-try:
-    from sklearn.manifold import TSNE
-    from sklearn.decomposition import PCA
-except ImportError:
-    TSNE = None
-    PCA = None
+def select_device():
+    import torch
 
+    try:
+        import torch_directml
+    except ImportError:
+        torch_directml = None
 
-def train_graph_embeddings(rdf_file_path: str,
-                           save_dir: str = "hsr_embedding_results"):
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch_directml is not None:
+        return torch_directml.device()
+    return "cpu"
 
-    g = rdflib.Graph()
-    g.parse(rdf_file_path, format="xml")
 
-    triples = []
-    entity_types = {}
-    for s, p, o in g:
-        s_str, p_str, o_str = str(s), str(p), str(o)
-        triples.append([s_str, p_str, o_str])
-        if p_str == "http://www.w3.org/1999/02/22-rdf-syntax-ns#type":
-            entity_types.setdefault(s_str, set()).add(o_str)
-    triples = np.array(triples, dtype=str)
+def training_is_stale(rdf_file_path: str, save_dir: str = "hsr_embedding_results") -> bool:
+    """True, если сохранённая модель обучена не на текущей версии RDF-файла."""
+    try:
+        with open(os.path.join(save_dir, SOURCE_FILE), encoding="utf-8") as f:
+            source = json.load(f)
+    except (OSError, ValueError):
+        return True
+    return source.get("sha1") != file_sha1(rdf_file_path)
 
-    tf = TriplesFactory.from_labeled_triples(triples)
-    training, testing = tf.split([0.8, 0.2], random_state=42)
 
-    if torch.cuda.is_available():
-        device = "cuda"
-    elif torch_directml is not None:
-        device = torch_directml.device()
+def _load_selected(rdf_file_path: str, selection: TripleSelection | None):
+
+    from embedding_triples import DEFAULT_SELECTION, entity_types_of, format_report, select_triples
+    from ontology.inference import ASSERTED_GRAPH, INFERRED_GRAPH, load_with_inference
+
+    # обучение — на исходных триплетах, типы сущностей — с учётом выведенных по RDFS
+    ds = load_with_inference(rdf_file_path)
+    asserted, inferred = ds.graph(ASSERTED_GRAPH), ds.graph(INFERRED_GRAPH)
+
+    selected, report = select_triples(asserted, selection or DEFAULT_SELECTION)
+    print("Отбор триплетов для обучения:")
+    print(format_report(report))
+    return selected, entity_types_of(asserted, inferred)
+
+
+def _checkpoint_name(kind: str, rdf_file_path: str) -> str:
+    # отпечаток RDF в имени: контрольная точка от другой версии онтологии не подхватится
+    return f"{kind}-{file_sha1(rdf_file_path)[:12]}.pt"
+
+
+def checkpoint_directory(save_dir: str, checkpoint_name: str) -> str:
+    # свой каталог на каждую контрольную точку: аварийные точки разных запусков не смешиваются
+    return os.path.join(save_dir, CHECKPOINT_SUBDIR, os.path.splitext(checkpoint_name)[0])
+
+
+def _adopt_failure_checkpoint(checkpoint_dir: str, checkpoint_name: str):
+    """
+    При сбое pykeen пишет PyKEEN_just_saved_my_day_<дата>.pt, а продолжает обучение только
+    с checkpoint_name: самая свежая аварийная точка, если она новее, переименовывается в него.
+    """
+    path = os.path.join(checkpoint_dir, checkpoint_name)
+    failures = sorted(glob.glob(os.path.join(checkpoint_dir, FAILURE_CHECKPOINT_GLOB)), key=os.path.getmtime)
+    if not failures:
+        return
+    latest = failures.pop()
+    if not os.path.exists(path) or os.path.getmtime(latest) > os.path.getmtime(path):
+        os.replace(latest, path)
     else:
-        device = "cpu"
+        failures.append(latest)
+    for stale in failures:
+        os.remove(stale)
 
-    os.makedirs(save_dir, exist_ok=True)
+
+def run_training_pipeline(save_dir: str, checkpoint_name: str, num_epochs: int, patience: int, eval_frequency: int,
+                          **kwargs):
+    """
+    pipeline pykeen с ранней остановкой по MRR на валидации, контрольными точками
+    и журналом метрик в JSONL. Если прошлый запуск упал, обучение продолжается
+    с контрольной точки checkpoint_name или с аварийной точки, которую pykeen
+    сохранил при сбое.
+    """
+
+    from pykeen.pipeline import pipeline
 
     result = pipeline(
-        training=training,
-        testing=testing,
-        model="DistMult",
-        model_kwargs=dict(embedding_dim=100),     
-        training_kwargs=dict(num_epochs=400),     
-        random_seed=42,
-        device=device,
+        training_kwargs=dict(num_epochs=num_epochs, **_checkpoint_kwargs(save_dir, checkpoint_name)),
+        stopper="early",
+        stopper_kwargs=_stopper_kwargs(eval_frequency, patience),
+        result_tracker=_training_tracker(save_dir),
+        **kwargs,
+    )
+    _report_stopper(result.stopper)
+    return result
+
+
+def _checkpoint_kwargs(save_dir: str, checkpoint_name: str) -> dict:
+    """Параметры контрольных точек для TrainingLoop.train; аварийная точка прошлого запуска подхватывается."""
+    checkpoint_dir = checkpoint_directory(save_dir, checkpoint_name)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _adopt_failure_checkpoint(checkpoint_dir, checkpoint_name)
+    if os.path.exists(os.path.join(checkpoint_dir, checkpoint_name)):
+        print(f"Продолжение обучения с контрольной точки {checkpoint_name}")
+    return dict(
+        checkpoint_name=checkpoint_name,
+        checkpoint_directory=checkpoint_dir,
+        checkpoint_frequency=CHECKPOINT_MINUTES,
+        checkpoint_on_failure=True,
     )
 
-    result.save_to_directory(save_dir)
+
+def _training_tracker(save_dir: str):
+    """
+    Журнал метрик в JSONL. JSONResultTracker из pykeen 1.10 пишет через json.dumps без default
+    и падает на параметрах-объектах (экземпляр loss в model_kwargs), такие значения пишутся строкой.
+    """
+
+    from pykeen.trackers import JSONResultTracker
+
+    class Tracker(JSONResultTracker):
+        def _write(self, obj):
+            print(json.dumps(obj, default=str), file=self.file, flush=True)
+
+    return Tracker(path=os.path.join(save_dir, TRAINING_LOG))
+
+
+def _stopper_kwargs(eval_frequency: int, patience: int) -> dict:
+    return dict(
+        frequency=eval_frequency,
+        patience=patience,
+        metric="inverse_harmonic_mean_rank",
+        relative_delta=0.002,
+    )
+
+
+def _report_stopper(stopper):
+    if getattr(stopper, "stopped", False):
+        print(f"Ранняя остановка: лучший MRR {stopper.best_metric:.4f} на эпохе {stopper.best_epoch}")
+
+
+def _save_training(model, tf, entity_types, save_dir: str, rdf_file_path: str, result=None,
+                   checkpoint_name: str | None = None):
+    """
+    Модель, карты id, типы сущностей и отпечаток RDF (source.json). result — итог pipeline:
+    без него (дообучение не понадобилось) модель сохраняется как в result.save_to_directory.
+    """
+
+    if result is not None:
+        result.save_to_directory(save_dir)
+    else:
+        import torch
+
+        os.makedirs(save_dir, exist_ok=True)
+        torch.save(model, os.path.join(save_dir, MODEL_FILE))
+    export_embeddings(model, tf, entity_types, os.path.join(save_dir, SERVING_SUBDIR))
 
     tf_path = os.path.join(save_dir, "triples_factory.pkl")
     with open(tf_path, "wb") as f:
@@ -72,13 +204,230 @@ def train_graph_embeddings(rdf_file_path: str,
     types_path = os.path.join(save_dir, "entity_types.pkl")
     with open(types_path, "wb") as f:
         pickle.dump(entity_types, f)
+    with open(os.path.join(save_dir, SOURCE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"rdf": rdf_file_path, "sha1": file_sha1(rdf_file_path)}, f, indent=2)
+
+    # модель сохранена — контрольные точки запуска больше не нужны
+    if checkpoint_name:
+        shutil.rmtree(checkpoint_directory(save_dir, checkpoint_name), ignore_errors=True)
+
+
+def train_graph_embeddings(rdf_file_path: str,
+                           save_dir: str = "hsr_embedding_results",
+                           selection: TripleSelection | None = None,
+                           num_epochs: int = NUM_EPOCHS,
+                           patience: int = PATIENCE,
+                           eval_frequency: int = EVAL_FREQUENCY):
+
+    import torch
+    from embedding_triples import encode_triples
+    from pykeen.triples import TriplesFactory
+
+    selected, entity_types = _load_selected(rdf_file_path, selection)
+    mapped, entity_to_id, relation_to_id = encode_triples(selected)
+
+    tf = TriplesFactory(
+        mapped_triples=torch.from_numpy(mapped),
+        entity_to_id=entity_to_id,
+        relation_to_id=relation_to_id,
+    )
+    training, testing, validation = tf.split([0.8, 0.1, 0.1], random_state=42)
+
+    device = select_device()
+
+    os.makedirs(save_dir, exist_ok=True)
+
+    checkpoint_name = _checkpoint_name("full", rdf_file_path)
+    result = run_training_pipeline(
+        save_dir,
+        checkpoint_name,
+        num_epochs,
+        patience,
+        eval_frequency,
+        training=training,
+        testing=testing,
+        validation=validation,
+        model="DistMult",
+        model_kwargs=dict(embedding_dim=100),
+        random_seed=42,
+        device=device,
+    )
+
+    _save_training(result.model, tf, entity_types, save_dir, rdf_file_path, result, checkpoint_name)
+
+    return result.model, tf, entity_types
+
+
+def _warm_start_model(old_model, tf, random_seed: int = 42):
+    """Модель того же класса и размерности под новые карты id; строки известных сущностей и отношений копируются."""
+
+    import torch
+
+    embedding_dim = old_model.entity_representations[0].shape[0]
+    model = type(old_model)(triples_factory=tf, embedding_dim=embedding_dim, random_seed=random_seed)
+    with torch.no_grad():
+        pairs = (
+            (model.entity_representations[0], old_model.entity_representations[0]),
+            (model.relation_representations[0], old_model.relation_representations[0]),
+        )
+        for new, old in pairs:
+            old_weight = old._embeddings.weight
+            new._embeddings.weight[:old_weight.shape[0]] = old_weight.to(new._embeddings.weight.device)
+    return model
+
+
+def _fine_tune(model, training, validation, testing, filter_triples, save_dir: str, checkpoint_name: str,
+               num_epochs: int, patience: int, eval_frequency: int, random_seed: int = 42):
+    """
+    Дообучение готовой модели напрямую через SLCWATrainingLoop, без сброса её весов, — с той же
+    ранней остановкой, контрольными точками и журналом, что в run_training_pipeline. Результат —
+    PipelineResult, как у pipeline, чтобы сохранение не отличалось от полного обучения.
+    """
+
+    import time
+    from pykeen.evaluation import RankBasedEvaluator
+    from pykeen.pipeline import PipelineResult
+    from pykeen.stoppers import EarlyStopper
+    from pykeen.training import SLCWATrainingLoop
+    from pykeen.utils import set_random_seed
+
+    set_random_seed(random_seed)
+    tracker = _training_tracker(save_dir)
+    tracker.start_run()
+    evaluator = RankBasedEvaluator()
+    loop = SLCWATrainingLoop(model=model, triples_factory=training, result_tracker=tracker)
+    stopper = EarlyStopper(
+        model=model,
+        evaluator=evaluator,
+        training_triples_factory=training,
+        evaluation_triples_factory=validation,
+        result_tracker=tracker,
+        **_stopper_kwargs(eval_frequency, patience),
+    )
+
+    # без продолжения с контрольной точки train() вызывает model.reset_parameters_() и стёр бы
+    # тёплый старт; на время обучения сброс отключается атрибутом экземпляра, после — снимается
+    model.reset_parameters_ = lambda: model
+    started = time.perf_counter()
+    try:
+        losses = loop.train(
+            triples_factory=training,
+            num_epochs=num_epochs,
+            stopper=stopper,
+            **_checkpoint_kwargs(save_dir, checkpoint_name),
+        )
+    finally:
+        del model.reset_parameters_
+    train_seconds = time.perf_counter() - started
+    _report_stopper(stopper)
+
+    started = time.perf_counter()
+    metrics = evaluator.evaluate(model, testing.mapped_triples, additional_filter_triples=[filter_triples])
+    evaluate_seconds = time.perf_counter() - started
+    tracker.log_metrics(metrics.to_flat_dict(), prefix="testing")
+    tracker.end_run()
+
+    return PipelineResult(
+        random_seed=random_seed,
+        model=model,
+        training=training,
+        training_loop=loop,
+        losses=losses,
+        stopper=stopper,
+        metric_results=metrics,
+        train_seconds=train_seconds,
+        evaluate_seconds=evaluate_seconds,
+    )
+
+
+def train_incremental(rdf_file_path: str,
+                      save_dir: str = "hsr_embedding_results",
+                      selection: TripleSelection | None = None,
+                      num_epochs: int = INCREMENTAL_EPOCHS,
+                      old_ratio: float = OLD_TRIPLES_RATIO,
+                      random_seed: int = 42,
+                      patience: int = PATIENCE,
+                      eval_frequency: int = EVAL_FREQUENCY):
+    """
+    Дообучение после обновления онтологии: id известных сущностей и отношений сохраняются,
+    их эмбеддинги берутся из прошлой модели, новые инициализируются заново. Модель
+    дообучается несколько эпох на всех новых триплетах вперемешку с выборкой старых
+    (old_ratio старых на один новый), так что время растёт с размером изменения, а не графа.
+    Тестовая и валидационная выборки строятся только из старых триплетов.
+    """
+
+    import torch
+    from embedding_triples import encode_triples
+    from pykeen.triples import TriplesFactory
+
+    old_model, old_tf, _ = load_saved_model(save_dir)
+    selected, entity_types = _load_selected(rdf_file_path, selection)
+    mapped, entity_to_id, relation_to_id = encode_triples(selected, old_tf.entity_to_id, old_tf.relation_to_id)
+
+    tf = TriplesFactory(
+        mapped_triples=torch.from_numpy(mapped),
+        entity_to_id=entity_to_id,
+        relation_to_id=relation_to_id,
+    )
+
+    # новые триплеты ищутся по всему графу и все идут в дообучение;
+    # тест и валидация берутся только из старых, чтобы не отнимать у модели новые факты
+    old_rows = {tuple(row) for row in old_tf.mapped_triples.tolist()}
+    is_new = np.array([tuple(row) not in old_rows for row in mapped.tolist()], dtype=bool)
+    new_rows = mapped[is_new]
+    print(f"Новых триплетов: {len(new_rows)}, новых сущностей: {len(entity_to_id) - len(old_tf.entity_to_id)}, "
+          f"новых отношений: {len(relation_to_id) - len(old_tf.relation_to_id)}")
+
+    model = _warm_start_model(old_model, tf, random_seed)
+    if not len(new_rows):
+        # изменились только удаления или типы: эмбеддинги те же, сохраняются карты, артефакт
+        # и отпечаток RDF, чтобы training_is_stale не требовал дообучения снова
+        _save_training(model, tf, entity_types, save_dir, rdf_file_path)
+        return model, tf, entity_types
+
+    kept = TriplesFactory(
+        mapped_triples=torch.from_numpy(mapped[~is_new]),
+        entity_to_id=entity_to_id,
+        relation_to_id=relation_to_id,
+    )
+    old_training, testing, validation = kept.split([0.8, 0.1, 0.1], random_state=random_seed)
+    old_candidates = old_training.mapped_triples.numpy()
+
+    rng = np.random.default_rng(random_seed)
+    n_old = min(len(old_candidates), int(round(old_ratio * len(new_rows))))
+    mix = np.concatenate([new_rows, old_candidates[rng.choice(len(old_candidates), n_old, replace=False)]])
+    fine_tune = TriplesFactory(
+        mapped_triples=torch.from_numpy(mix),
+        entity_to_id=entity_to_id,
+        relation_to_id=relation_to_id,
+    )
+
+    checkpoint_name = _checkpoint_name("incremental", rdf_file_path)
+    result = _fine_tune(
+        model.to(select_device()),
+        fine_tune,
+        validation,
+        testing,
+        tf.mapped_triples,
+        save_dir,
+        checkpoint_name,
+        num_epochs,
+        patience,
+        eval_frequency,
+        random_seed,
+    )
+
+    _save_training(result.model, tf, entity_types, save_dir, rdf_file_path, result, checkpoint_name)
 
     return result.model, tf, entity_types
 
 
 def load_saved_model(directory: str = "hsr_embedding_results"):
-    
-    model = TransEModel.load(os.path.join(directory, "model.pkl"))
+
+    import torch
+
+    # pykeen сохраняет модель целиком через torch.save
+    model = torch.load(os.path.join(directory, MODEL_FILE), weights_only=False)
     
     tf_path = os.path.join(directory, "triples_factory.pkl")
     with open(tf_path, "rb") as f:
@@ -91,8 +440,33 @@ def load_saved_model(directory: str = "hsr_embedding_results"):
     
     return model, tf, entity_types
 
+def export_embeddings(model, tf, entity_types: dict | None = None, out_dir: str = "hsr_embedding_results/serving"):
+
+    import torch
+
+    entity_ids = torch.arange(len(tf.entity_to_id))
+    entities = model.entity_representations[0](indices=entity_ids).detach().cpu().numpy()
+    relation_ids = torch.arange(len(tf.relation_to_id))
+    relations = model.relation_representations[0](indices=relation_ids).detach().cpu().numpy()
+
+    id_to_entity = {v: k for k, v in tf.entity_to_id.items()}
+    id_to_relation = {v: k for k, v in tf.relation_to_id.items()}
+    write_store(
+        out_dir,
+        entities,
+        relations,
+        [id_to_entity[i] for i in range(len(entities))],
+        [id_to_relation[i] for i in range(len(relations))],
+        entity_types,
+        model_name=type(model).__name__,
+        triples=tf.mapped_triples.numpy(),
+    )
+
+
 def get_entity_embedding(entity_uri: str, model, tf):
 
+    import torch
+
     try:
         entity_id = tf.entity_to_id[entity_uri]
         embedding = model.entity_representations[0](indices=torch.tensor([entity_id])).detach().numpy()[0]
@@ -104,6 +478,8 @@ def get_entity_embedding(entity_uri: str, model, tf):
 
 def get_relation_embedding(relation_uri: str, model, tf):
 
+    import torch
+
     try:
         relation_id = tf.relation_to_id[relation_uri]
         embedding = model.relation_representations[0](indices=torch.tensor([relation_id])).detach().numpy()[0]
@@ -113,50 +489,23 @@ def get_relation_embedding(relation_uri: str, model, tf):
         return None
 
 
-def find_similar_entities(entity_uri: str, model, tf, entity_types: dict | None = None, top_k: int = 5):
+def build_similarity_index(model, tf, entity_types: dict | None = None):
 
-    from sklearn.metrics.pairwise import cosine_similarity
-    
-    entity_embedding = get_entity_embedding(entity_uri, model, tf)
-    if entity_embedding is None:
+    embeddings, labels = collect_all_embeddings(model, tf)
+    return SimilarityIndex(embeddings, labels, entity_types)
+
+
+def find_similar_entities(entity_uri: str, model, tf, entity_types: dict | None = None, top_k: int = 5,
+                          index: SimilarityIndex | None = None):
+
+    if index is None:
+        index = build_similarity_index(model, tf, entity_types)
+
+    if entity_uri not in index.index:
+        print(f"Сущность {entity_uri} не найдена в графе.")
         return []
-    
-    all_entity_ids = torch.arange(len(tf.entity_to_id))
-    all_embeddings = model.entity_representations[0](indices=all_entity_ids).detach().numpy()
-    
-    similarities = cosine_similarity([entity_embedding], all_embeddings)[0]
-    
-    top_indices = np.argsort(similarities)[::-1][1:]
-    
-    results = []
-    id_to_entity = {v: k for k, v in tf.entity_to_id.items()}
-    
-    filtered = []
-    if entity_types and entity_uri in entity_types:
-        target_types = entity_types.get(entity_uri, set())
-        for idx in top_indices:
-            uri = id_to_entity[idx]
-            types = entity_types.get(uri, set())
-            if target_types & types:
-                filtered.append(idx)
-            if len(filtered) >= top_k:
-                break
-    else:
-        filtered = list(top_indices[:top_k])
-    
-    i = 0
-    while len(filtered) < top_k and i < len(top_indices):
-        idx = top_indices[i]
-        if idx not in filtered:
-            filtered.append(idx)
-        i += 1
-    
-    for idx in filtered[:top_k]:
-        similar_entity = id_to_entity[idx]
-        similarity = similarities[idx]
-        results.append((similar_entity, similarity))
-    
-    return results
+
+    return index.top_k(entity_uri, top_k, same_type=bool(entity_types))
 
 
 def reduce_embeddings(embeddings,
@@ -164,11 +513,15 @@ def reduce_embeddings(embeddings,
                       random_state: int = 42,
                       perplexity: int = 30):
     if method == "pca":
-        if PCA is None:
+        try:
+            from sklearn.decomposition import PCA
+        except ImportError:
             raise ImportError("Скрипт запущен без scikit-learn. Установи scikit-learn для PCA.")
         reducer = PCA(n_components=2, random_state=random_state)
     else:
-        if TSNE is None:
+        try:
+            from sklearn.manifold import TSNE
+        except ImportError:
             raise ImportError("Скрипт запущен без scikit-learn. Установи scikit-learn для t-SNE.")
         n_samples = len(embeddings)
         if n_samples < 2:
@@ -187,6 +540,8 @@ def reduce_embeddings(embeddings,
 
 def collect_all_embeddings(model, tf):
 
+    import torch
+
     all_entity_ids = torch.arange(len(tf.entity_to_id))
     embeddings = model.entity_representations[0](indices=all_entity_ids).detach().numpy()
     
@@ -202,6 +557,7 @@ def plot_embeddings_2d(points_2d,
                        save_path: str | None = None,
                        figsize=(12, 10)):
 
+    plt = _pyplot()
     if plt is None:
         raise ImportError("matplotlib не установлен. Установи matplotlib для визуализации.")
 
@@ -226,7 +582,7 @@ def plot_embeddings_2d(points_2d,
         plt.show()
 
 
-def visualize_embeddings(model: TransE,
+def visualize_embeddings(model: Model,
                          triples_factory: TriplesFactory,
                          method: str = "tsne",
                          max_labels: int = 75,
@@ -236,6 +592,18 @@ def visualize_embeddings(model: TransE,
                          random_state: int = 42):
 
     embeddings, labels = collect_all_embeddings(model, triples_factory)
+    visualize_matrix(embeddings, labels, method=method, max_labels=max_labels, save_path=save_path,
+                     perplexity=perplexity, max_points=max_points, random_state=random_state)
+
+
+def visualize_matrix(embeddings,
+                     labels,
+                     method: str = "tsne",
+                     max_labels: int = 75,
+                     save_path: str = "hsr_embedding_results/embeddings.png",
+                     perplexity: int = 30,
+                     max_points: int = 1200,
+                     random_state: int = 42):
 
     if max_points and len(embeddings) > max_points:
         rng = np.random.default_rng(random_state)
@@ -268,6 +636,12 @@ def find_rdf_file():
 
 
 def main():
+    ap = argparse.ArgumentParser(description="Обучение эмбеддингов онтологии HSR и примеры запросов к ним")
+    ap.add_argument("--epochs", type=int, default=NUM_EPOCHS, help="Максимум эпох полного обучения")
+    ap.add_argument("--patience", type=int, default=PATIENCE, help="Оценок без улучшения MRR до ранней остановки")
+    ap.add_argument("--eval-every", type=int, default=EVAL_FREQUENCY, help="Эпох между оценками на валидации")
+    args = ap.parse_args()
+
     save_dir = "hsr_embedding_results"
     
     try:
@@ -275,11 +649,21 @@ def main():
     except FileNotFoundError as e:
         return
     
-    if os.path.exists(save_dir) and os.path.exists(os.path.join(save_dir, "model.pkl")):
-        model, tf, entity_types = load_saved_model(save_dir)
-    else:
-        model, tf, entity_types = train_graph_embeddings(rdf_file, save_dir)
+    # torch и pykeen нужны, только если артефакта для запросов ещё нет
+    serving_dir = os.path.join(save_dir, SERVING_SUBDIR)
+    if not os.path.exists(os.path.join(save_dir, MODEL_FILE)):
+        train_graph_embeddings(rdf_file, save_dir, num_epochs=args.epochs, patience=args.patience,
+                               eval_frequency=args.eval_every)
         print("Обучение завершено.")
+    elif training_is_stale(rdf_file, save_dir):
+        # онтология изменилась: дообучение прошлой модели вместо обучения с нуля
+        train_incremental(rdf_file, save_dir, patience=args.patience, eval_frequency=args.eval_every)
+        print("Дообучение завершено.")
+    elif not os.path.exists(os.path.join(serving_dir, "meta.json")):
+        model, tf, entity_types = load_saved_model(save_dir)
+        export_embeddings(model, tf, entity_types, serving_dir)
+    store = EmbeddingStore.load(serving_dir)
+    entity_types = store.types_by_entity()
     
     results_path = os.path.join(save_dir, "results.json")
     if os.path.exists(results_path):
@@ -345,6 +729,7 @@ def main():
     if not class_to_entities:
         print("Не удалось найти классы в онтологии для демонстрации.")
     else:
+        index = store.similarity_index()
         for class_uri in sorted(class_to_entities.keys(), key=lambda u: u.split("#")[-1]):
             class_name = class_uri.split("#")[-1]
             representative = class_to_entities[class_uri][0]
@@ -352,7 +737,7 @@ def main():
             print(f"\n→ Класс: {class_name}")
             print(f"  Представитель: {rep_name}")
 
-            similar = find_similar_entities(representative, model, tf, entity_types=entity_types, top_k=3)
+            similar = index.top_k(representative, 3)
             if similar:
                 print("  Похожие сущности (топ-3):")
                 for sim_entity, similarity in similar:
@@ -361,14 +746,15 @@ def main():
             else:
                 print("  Похожие сущности не найдены.")
     
-    example_entity = list(tf.entity_to_id.keys())[0] 
-    example_embedding = get_entity_embedding(example_entity, model, tf)
+    example_entity = store.entity_labels[0]
+    example_embedding = store.entity_vector(example_entity)
     if example_embedding is not None:
         print(f"\nПример вектора встраивания для сущности '{example_entity.split('#')[-1]}':")
         print(f"  Размерность: {len(example_embedding)}")
         print(f"  Вектор: {example_embedding[:10]}...") 
     
-    visualize_embeddings(model, tf, method="tsne", max_labels=75, save_path="hsr_embedding_results/embeddings.png")
+    visualize_matrix(store.feature_matrix(), store.entity_labels, method="tsne", max_labels=75,
+                     save_path="hsr_embedding_results/embeddings.png")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+"""
+Общие вспомогательные функции без тяжёлых зависимостей.
+"""
+import hashlib
+import sys
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+
+def file_sha1(path: str) -> str:
+    """sha1 содержимого файла — отпечаток для кэшей, построенных по этому файлу."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def peak_rss_mb() -> float | None:
+    """Пиковый RSS процесса в МБ; None там, где нет модуля resource (Windows)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)